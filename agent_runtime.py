@@ -0,0 +1,150 @@
+"""
+Process-wide registry of the objects Majid needs to talk to the APIs.
+
+The LLM clients, the embedding client, the shared HTTP connection pool and the agent
+executor are built once, on first use, and shared by the web chatbox, the Tk chatbox,
+the PDF tool and the menu bar summary. Everything is rebuilt when the API keys in the
+.env file change. The old objects are only dropped, not closed: a request that is still
+running with them finishes, and the old connection pool is closed once nothing uses it.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import weakref
+import threading
+import httpx
+from dotenv import dotenv_values
+from langchain_core.embeddings import Embeddings
+from langchain_openai import ChatOpenAI, OpenAIEmbeddings
+
+#----------------------------------------------------------------------------
+# Settings
+#----------------------------------------------------------------------------
+
+user_dir = os.path.expanduser("~/Library/Application Support/Majid")
+ENV_PATH = os.path.join(user_dir, ".env")
+API_KEYS = ("OPENAI_API_KEY", "TAVILY_API_KEY")
+
+#----------------------------------------------------------------------------
+# Registry
+#----------------------------------------------------------------------------
+
+class AgentRuntime:
+    """Lazily built, shared objects, dropped whenever the API keys change."""
+
+    def __init__(self, env_path=ENV_PATH):
+        self.env_path = env_path
+        self.lock = threading.RLock()
+        self.objects = {}
+        self.env_mtime = None
+        self.keys = None
+        self.listeners = []
+
+    def _check_keys(self):
+        # Only re-read the .env file when it was modified
+        try:
+            mtime = os.path.getmtime(self.env_path)
+        except OSError:
+            mtime = None
+        if mtime == self.env_mtime and self.keys is not None:
+            return
+        self.env_mtime = mtime
+
+        values = dotenv_values(self.env_path) if mtime is not None else {}
+        keys = tuple(values.get(k) or "" for k in API_KEYS)
+        if keys == self.keys:
+            return
+
+        print("\nAPI keys changed, rebuilding the agent runtime...\n")
+        for name, value in zip(API_KEYS, keys):
+            if value:
+                os.environ[name] = value
+            else:
+                os.environ.pop(name, None)
+        first = self.keys is None
+        self.keys = keys
+        self.objects = {}
+        if not first:
+            for listener in list(self.listeners):
+                try:
+                    listener()
+                except Exception as e:
+                    print(f"Error in API key listener: {e}")
+
+    def get(self, name, factory):
+        """Return the shared object called name, building it with factory() the first time."""
+        with self.lock:
+            self._check_keys()
+            if name not in self.objects:
+                self.objects[name] = factory()
+            return self.objects[name]
+
+    def add_listener(self, listener):
+        """Call listener() whenever the keys change after they were first read, e.g. to retry work that failed without them."""
+        with self.lock:
+            self.listeners.append(listener)
+
+    def reset(self):
+        """Drop every shared object, e.g. after the keys were changed in this process."""
+        with self.lock:
+            self.keys = None
+            self.env_mtime = None
+            self.objects = {}
+
+
+_runtime = AgentRuntime()
+
+def get_runtime():
+    return _runtime
+
+#----------------------------------------------------------------------------
+# Shared clients
+#----------------------------------------------------------------------------
+
+def _make_http_client():
+    transport = httpx.HTTPTransport(limits=httpx.Limits(max_connections=20, max_keepalive_connections=10))
+    client = httpx.Client(transport=transport, timeout=httpx.Timeout(60.0, connect=10.0))
+    # Closed when the last LLM or agent holding the client is gone, not when the keys change
+    weakref.finalize(client, transport.close)
+    return client
+
+
+def get_http_client():
+    """Keep-alive connection pool shared by every OpenAI client."""
+    return _runtime.get("http_client", _make_http_client)
+
+
+def get_llm(model_name="gpt-3.5-turbo", temperature=1, **kwargs):
+    """Shared chat model; one instance per set of settings."""
+    name = ("llm", model_name, temperature, tuple(sorted(kwargs.items())))
+    return _runtime.get(name, lambda: ChatOpenAI(
+        model_name=model_name,
+        temperature=temperature,
+        http_client=get_http_client(),
+        **kwargs,
+    ))
+
+
+def get_embeddings():
+    """Shared OpenAI embedding client."""
+    return _runtime.get("embeddings", lambda: OpenAIEmbeddings(http_client=get_http_client()))
+
+
+class SharedEmbeddings(Embeddings):
+    """
+    Embeddings that always go through the current shared client,
+    for long-lived objects that must keep working after the keys change.
+    """
+
+    @property
+    def model(self):
+        return get_embeddings().model
+
+    def embed_documents(self, texts):
+        return get_embeddings().embed_documents(texts)
+
+    def embed_query(self, text):
+        return get_embeddings().embed_query(text)
@@ -0,0 +1,127 @@
+"""
+Approximate-nearest-neighbour FAISS indexes.
+
+LangChain's FAISS vector store uses a flat index, which compares the query with every
+vector: exact, but linear in the size of the index. Indexes here are built from the vectors
+of such a flat index once it is complete:
+- "flat": exact search, kept as is
+- "ivfpq": vectors are assigned to clusters and compressed with product quantization;
+  a query only visits IVF_NPROBE clusters. Trained on a sample of the vectors.
+- "hnsw": graph search over the full vectors (more memory, no training)
+
+The result keeps the positions of the flat index, so the docstore and index_to_docstore_id
+of the vector store stay valid. Removing vectors is left to flat indexes: LangChain's
+FAISS.delete expects the positions after a removal to shift, which only flat indexes do.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import math
+import faiss
+import numpy as np
+
+INDEX_TYPES = ("flat", "ivfpq", "hnsw")
+
+# Smaller indexes stay flat: exact and already fast enough
+MIN_VECTORS = 10000
+
+# Vectors used to train IVF-PQ
+TRAIN_SAMPLE = 20000
+
+IVF_NPROBE = 16
+PQ_BITS = 8
+# One byte per 4 dimensions: 4x smaller than float32. Coarser codes lose recall fast
+# (recall@10 0.86 at 4 dimensions, 0.57 at 16 in benchmarks/bench_ann.py)
+PQ_SUBVECTOR_DIMS = 4
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+
+# Vectors added to a new index at a time
+_ADD_BLOCK = 50000
+
+#----------------------------------------------------------------------------
+# Building
+#----------------------------------------------------------------------------
+
+def ivf_lists(n):
+    """Number of IVF clusters for n vectors, with enough training points per cluster."""
+    return max(1, min(int(4 * math.sqrt(n)), n // 39))
+
+
+def pq_subquantizers(dim):
+    """Largest divisor of dim that gives subvectors of at least PQ_SUBVECTOR_DIMS dimensions."""
+    for m in range(max(1, dim // PQ_SUBVECTOR_DIMS), 0, -1):
+        if dim % m == 0:
+            return m
+    return 1
+
+
+def sample_rows(vectors, size, seed=0):
+    if len(vectors) <= size:
+        return vectors
+    rows = np.random.default_rng(seed).choice(len(vectors), size=size, replace=False)
+    return vectors[np.sort(rows)]
+
+
+def tune(index):
+    """Set the search-time parameters of an index (they are not all kept by faiss.read_index)."""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = HNSW_EF_SEARCH
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = IVF_NPROBE
+    return index
+
+
+def make_index(kind, dim, sample=None, metric=faiss.METRIC_L2):
+    """An empty index of the given kind, trained on sample when it needs training."""
+    if kind == "flat":
+        return faiss.IndexFlat(dim, metric)
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, HNSW_M, metric)
+        index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+        return tune(index)
+    if kind == "ivfpq":
+        if sample is None or len(sample) < 2 ** PQ_BITS:
+            raise ValueError(f"IVF-PQ needs at least {2 ** PQ_BITS} training vectors")
+        sample = np.ascontiguousarray(sample, dtype=np.float32)
+        quantizer = faiss.IndexFlat(dim, metric)
+        index = faiss.IndexIVFPQ(quantizer, dim, ivf_lists(len(sample)), pq_subquantizers(dim), PQ_BITS, metric)
+        index.train(sample)
+        return tune(index)
+    raise ValueError(f"Unknown index type: {kind} (expected one of {', '.join(INDEX_TYPES)})")
+
+
+def build_index(kind, vectors, train_sample=TRAIN_SAMPLE, metric=faiss.METRIC_L2):
+    """An index of the given kind holding vectors, in the same order."""
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    sample = sample_rows(vectors, train_sample) if kind == "ivfpq" else None
+    index = make_index(kind, vectors.shape[1], sample, metric)
+    for start in range(0, len(vectors), _ADD_BLOCK):
+        index.add(vectors[start:start + _ADD_BLOCK])
+    return index
+
+
+def refill(index, vectors):
+    """A copy of a trained index holding vectors instead of its own, without training again."""
+    index = faiss.clone_index(index)
+    index.reset()
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    for start in range(0, len(vectors), _ADD_BLOCK):
+        index.add(vectors[start:start + _ADD_BLOCK])
+    return tune(index)
+
+
+def convert_vectorstore(vectorstore, kind, min_vectors=MIN_VECTORS):
+    """
+    Replace the flat index of a LangChain FAISS vector store by one of the given kind.
+    Indexes with fewer than min_vectors vectors, or that are not flat, are left alone.
+    """
+    index = vectorstore.index
+    if kind == "flat" or not isinstance(index, faiss.IndexFlat) or index.ntotal < min_vectors:
+        return vectorstore
+    vectorstore.index = build_index(kind, index.reconstruct_n(0, index.ntotal), metric=index.metric_type)
+    return vectorstore
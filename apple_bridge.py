@@ -0,0 +1,126 @@
+"""
+Bridge to Reminders and Calendar through one long-lived helper process.
+
+Instead of starting osascript for every question, a single helper (apple_helper.js, run by
+osascript as JavaScript for Automation) is started on first use and kept running. Requests
+and answers are single lines of JSON on its stdin and stdout, and answers are lists of
+records rather than text. If the helper dies or does not answer in time it is restarted on
+the next call.
+
+The command is configurable, so any program speaking the same protocol can stand in for
+the helper, e.g. benchmarks/fake_apple_helper.py on Linux.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import json
+import queue
+import itertools
+import threading
+import subprocess
+
+HELPER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "apple_helper.js")
+HELPER_COMMAND = ["osascript", "-l", "JavaScript", HELPER_PATH]
+
+DEFAULT_TIMEOUT = 30.0  # seconds
+
+_EOF = object()
+
+
+class BridgeError(Exception):
+    """The helper answered with an error, died, or did not answer in time."""
+
+#----------------------------------------------------------------------------
+# Bridge
+#----------------------------------------------------------------------------
+
+class AppleBridge:
+    """Sends requests to the helper one at a time and waits for their answers."""
+
+    def __init__(self, command=None, timeout=DEFAULT_TIMEOUT):
+        self.command = list(command or HELPER_COMMAND)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.process = None
+        self.lines = None
+        self.ids = itertools.count(1)
+
+    def _start(self):
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding="utf-8",
+            bufsize=1,
+        )
+        # Answers are read on a thread so a helper that hangs cannot block us past the timeout
+        self.lines = queue.Queue()
+        threading.Thread(
+            target=self._read, args=(self.process.stdout, self.lines), name="apple-bridge", daemon=True
+        ).start()
+
+    @staticmethod
+    def _read(stream, lines):
+        for line in stream:
+            lines.put(line)
+        lines.put(_EOF)
+
+    def _stop(self):
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=2)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+        self.process = None
+        self.lines = None
+
+    def call(self, method, timeout=None, **params):
+        """Run method in the helper and return its result."""
+        timeout = self.timeout if timeout is None else timeout
+        with self.lock:
+            if self.process is None or self.process.poll() is not None:
+                self._stop()
+                self._start()
+
+            request_id = next(self.ids)
+            try:
+                self.process.stdin.write(json.dumps({"id": request_id, "method": method, "params": params}) + "\n")
+                self.process.stdin.flush()
+            except OSError as e:
+                self._stop()
+                raise BridgeError(f"Helper is not running: {e}")
+
+            while True:
+                try:
+                    line = self.lines.get(timeout=timeout)
+                except queue.Empty:
+                    # It may be stuck on a dialog or a busy app; start a fresh one next time
+                    self.process.kill()
+                    self._stop()
+                    raise BridgeError(f"{method} did not answer in {timeout:g}s")
+                if line is _EOF:
+                    self._stop()
+                    raise BridgeError(f"Helper exited during {method}")
+                try:
+                    answer = json.loads(line)
+                except ValueError:
+                    continue  # anything else the helper printed
+                if not isinstance(answer, dict) or answer.get("id") != request_id:
+                    continue  # late answer of a request that timed out
+                if "error" in answer:
+                    raise BridgeError(answer["error"])
+                return answer.get("result")
+
+    def close(self):
+        with self.lock:
+            self._stop()
@@ -0,0 +1,270 @@
+"""
+Local cache of reminders and calendar events.
+
+Reminders and events are kept as Reminder and CalendarEvent records in apple_cache.db,
+with the time of the last sync. A sync asks the helper (through AppleBridge) only for the
+records modified since then, plus the ids that still exist so deleted ones can be dropped.
+Within max_age seconds of a sync the cache is used as is, so the agent calling the same
+tool several times in a conversation does not go back to the apps.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import time
+import sqlite3
+import datetime
+import threading
+
+user_dir = os.path.expanduser("~/Library/Application Support/Majid")
+CACHE_PATH = os.path.join(user_dir, "apple_cache.db")
+
+# Seconds after a sync during which the cache is answered without asking the apps
+MAX_AGE = 30
+
+# Changes are asked for from a bit before the last sync, in case the apps' clocks lag
+_SYNC_OVERLAP = 5.0
+
+# Cached calendar windows not synced for this many days are dropped
+KEEP_WINDOW_DAYS = 7
+
+#----------------------------------------------------------------------------
+# Records
+#----------------------------------------------------------------------------
+
+def parse_date(value):
+    """Helper dates (ISO strings, UTC) as aware datetimes in local time, or None."""
+    if not value:
+        return None
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone()
+
+
+class Reminder:
+    __slots__ = ("id", "name", "list", "completed", "due", "modified")
+
+    def __init__(self, id, name, list, completed, due=None, modified=None):
+        self.id = id
+        self.name = name
+        self.list = list
+        self.completed = bool(completed)
+        self.due = due
+        self.modified = modified
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record["id"], record["name"] or "", record["list"] or "", record["completed"],
+                   record.get("due"), record.get("modified"))
+
+    def row(self):
+        return (self.id, self.name, self.list, int(self.completed), self.due, self.modified)
+
+    def __repr__(self):
+        return f"Reminder({self.name!r}, list={self.list!r}, completed={self.completed})"
+
+
+class CalendarEvent:
+    __slots__ = ("uid", "summary", "calendar", "start", "end", "location", "modified")
+
+    def __init__(self, uid, summary, calendar, start, end=None, location=None, modified=None):
+        self.uid = uid
+        self.summary = summary
+        self.calendar = calendar
+        self.start = start
+        self.end = end
+        self.location = location
+        self.modified = modified
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record["uid"], record["summary"] or "", record["calendar"] or "", record["start"],
+                   record.get("end"), record.get("location"), record.get("modified"))
+
+    def row(self):
+        return (self.uid, self.summary, self.calendar, self.start, self.end, self.location, self.modified)
+
+    def start_time(self):
+        return parse_date(self.start)
+
+    def __repr__(self):
+        return f"CalendarEvent({self.summary!r}, start={self.start!r})"
+
+#----------------------------------------------------------------------------
+# Cache
+#----------------------------------------------------------------------------
+
+class AppleDataCache:
+    """Reminders and events synced incrementally from an AppleBridge."""
+
+    def __init__(self, bridge, db_path=CACHE_PATH, max_age=MAX_AGE):
+        self.bridge = bridge
+        self.db_path = db_path
+        self.max_age = max_age
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS reminders (
+                    id TEXT PRIMARY KEY,
+                    name TEXT NOT NULL,
+                    list TEXT NOT NULL,
+                    completed INTEGER NOT NULL,
+                    due TEXT,
+                    modified TEXT
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS events (
+                    uid TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    calendar TEXT NOT NULL,
+                    start TEXT NOT NULL,
+                    end TEXT,
+                    location TEXT,
+                    modified TEXT,
+                    window TEXT NOT NULL,
+                    PRIMARY KEY (window, uid)
+                )
+            ''')
+            # Time each sync started; the next one asks for the changes made after it
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS sync_state (
+                    name TEXT PRIMARY KEY,
+                    last_sync REAL NOT NULL
+                )
+            ''')
+        self.checked = {}
+
+    def _last_sync(self, name):
+        row = self.conn.execute("SELECT last_sync FROM sync_state WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def _fresh(self, name, force):
+        checked = self.checked.get(name)
+        return not force and checked is not None and time.monotonic() - checked < self.max_age
+
+    #********** Reminders **********
+
+    def sync_reminders(self, force=False, timeout=None):
+        """
+        Fetch the reminders changed since the last sync. Returns how many were updated.
+        timeout is passed to the bridge call (None: the bridge's own).
+        """
+        with self.lock:
+            if self._fresh("reminders", force):
+                return 0
+            started = time.time()
+            last_sync = self._last_sync("reminders")
+            since = int((last_sync - _SYNC_OVERLAP) * 1000) if last_sync else None
+
+            changes = self.bridge.call("reminder_changes", timeout=timeout, since=since)
+            existing = set(changes["ids"])
+            records = [Reminder.from_record(r) for r in changes["records"]]
+
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO reminders (id, name, list, completed, due, modified) VALUES (?, ?, ?, ?, ?, ?)",
+                    [r.row() for r in records],
+                )
+                cached = [row[0] for row in self.conn.execute("SELECT id FROM reminders")]
+                self.conn.executemany(
+                    "DELETE FROM reminders WHERE id = ?", [(i,) for i in cached if i not in existing]
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (name, last_sync) VALUES ('reminders', ?)", (started,)
+                )
+            self.checked["reminders"] = time.monotonic()
+            return len(records)
+
+    def reminders(self, list_name=None, include_completed=True, sync=True, timeout=None):
+        """Cached reminders, synced first unless sync is False; pending ones first."""
+        with self.lock:
+            if sync:
+                self.sync_reminders(timeout=timeout)
+            query = "SELECT id, name, list, completed, due, modified FROM reminders WHERE 1 = 1"
+            args = []
+            if list_name:
+                query += " AND list = ?"
+                args.append(list_name)
+            if not include_completed:
+                query += " AND completed = 0"
+            query += " ORDER BY completed, list, name"
+            return [Reminder(*row) for row in self.conn.execute(query, args)]
+
+    #********** Calendar **********
+
+    def sync_events(self, start, end, calendars=None, force=False, timeout=None):
+        """
+        Fetch the events between start and end (aware datetimes) changed since the last
+        sync of the same window. Returns how many were updated.
+        timeout is passed to the bridge call (None: the bridge's own).
+        """
+        window = self._window(start, end, calendars)
+        with self.lock:
+            if self._fresh(window, force):
+                return 0
+            started = time.time()
+            last_sync = self._last_sync(window)
+            since = int((last_sync - _SYNC_OVERLAP) * 1000) if last_sync else None
+
+            changes = self.bridge.call(
+                "event_changes",
+                timeout=timeout,
+                calendars=calendars,
+                start=int(start.timestamp() * 1000),
+                end=int(end.timestamp() * 1000),
+                since=since,
+            )
+            existing = set(changes["uids"])
+            events = [CalendarEvent.from_record(e) for e in changes["records"]]
+
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO events (uid, summary, calendar, start, end, location, modified, window) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [e.row() + (window,) for e in events],
+                )
+                cached = [row[0] for row in self.conn.execute("SELECT uid FROM events WHERE window = ?", (window,))]
+                self.conn.executemany(
+                    "DELETE FROM events WHERE window = ? AND uid = ?",
+                    [(window, u) for u in cached if u not in existing],
+                )
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO sync_state (name, last_sync) VALUES (?, ?)", (window, started)
+                )
+                old = [row[0] for row in self.conn.execute(
+                    "SELECT name FROM sync_state WHERE name LIKE 'events:%' AND last_sync < ?",
+                    (started - KEEP_WINDOW_DAYS * 86400,),
+                )]
+                for name in old:
+                    self.conn.execute("DELETE FROM events WHERE window = ?", (name,))
+                    self.conn.execute("DELETE FROM sync_state WHERE name = ?", (name,))
+            self.checked[window] = time.monotonic()
+            return len(events)
+
+    def events(self, start, end, calendars=None, sync=True, timeout=None):
+        """Cached events between start and end, synced first unless sync is False; by start time."""
+        window = self._window(start, end, calendars)
+        with self.lock:
+            if sync:
+                self.sync_events(start, end, calendars, timeout=timeout)
+            rows = self.conn.execute(
+                "SELECT uid, summary, calendar, start, end, location, modified FROM events "
+                "WHERE window = ? ORDER BY start",
+                (window,),
+            ).fetchall()
+        return [CalendarEvent(*row) for row in rows]
+
+    @staticmethod
+    def _window(start, end, calendars):
+        names = ",".join(calendars) if calendars else "*"
+        return f"events:{names}:{start.isoformat()}:{end.isoformat()}"
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,196 @@
+// Majid helper for Reminders and Calendar.
+//
+// Run with: osascript -l JavaScript apple_helper.js
+// Reads one JSON request per line on stdin, {"id": 1, "method": "reminders", "params": {...}},
+// and writes one JSON answer per line on stdout, {"id": 1, "result": ...} or {"id": 1, "error": "..."}.
+// Properties are read for whole collections at once (one Apple event per property), never
+// item by item, and the apps are left running between requests.
+
+ObjC.import('Foundation');
+
+const stdin = $.NSFileHandle.fileHandleWithStandardInput;
+const stdout = $.NSFileHandle.fileHandleWithStandardOutput;
+
+function send(message) {
+    const line = $(JSON.stringify(message) + "\n");
+    stdout.writeData(line.dataUsingEncoding($.NSUTF8StringEncoding));
+}
+
+function readChunk() {
+    const data = stdin.availableData;
+    if (data.length === 0) {
+        return null;  // stdin closed: Majid quit
+    }
+    return $.NSString.alloc.initWithDataEncoding(data, $.NSUTF8StringEncoding).js;
+}
+
+function iso(date) {
+    return date ? date.toISOString() : null;
+}
+
+//----------------------------------------------------------------------------
+// Methods
+//----------------------------------------------------------------------------
+
+function reminderRecords(items, listName, records) {
+    const ids = items.id();
+    const names = items.name();
+    const completed = items.completed();
+    const due = items.dueDate();
+    const modified = items.modificationDate();
+
+    for (let i = 0; i < ids.length; i++) {
+        records.push({
+            id: ids[i],
+            name: names[i],
+            list: listName,
+            completed: completed[i],
+            due: iso(due[i]),
+            modified: iso(modified[i]),
+        });
+    }
+}
+
+function reminders(params) {
+    const app = Application("Reminders");
+    const lists = params.list_name ? [app.lists.byName(params.list_name)] : app.lists();
+    const records = [];
+
+    lists.forEach(function (list) {
+        let items = list.reminders;
+        if (!params.include_completed) {
+            items = items.whose({completed: false});
+        }
+        reminderRecords(items, list.name(), records);
+    });
+    return records;
+}
+
+// Every reminder id, and the full records of those modified after params.since (ms)
+function reminderChanges(params) {
+    const app = Application("Reminders");
+    const since = params.since ? new Date(params.since) : null;
+    const ids = [];
+    const records = [];
+
+    app.lists().forEach(function (list) {
+        Array.prototype.push.apply(ids, list.reminders.id());
+        const items = since ? list.reminders.whose({modificationDate: {_greaterThan: since}}) : list.reminders;
+        reminderRecords(items, list.name(), records);
+    });
+    return {ids: ids, records: records};
+}
+
+function eventsBetween(calendar, params) {
+    return calendar.events.whose({
+        _and: [
+            {startDate: {_greaterThanEquals: new Date(params.start)}},
+            {startDate: {_lessThan: new Date(params.end)}},
+        ],
+    });
+}
+
+function eventRecords(items, calendarName, records) {
+    const uids = items.uid();
+    const summaries = items.summary();
+    const starts = items.startDate();
+    const ends = items.endDate();
+    const locations = items.location();
+    const modified = items.stampDate();
+
+    for (let i = 0; i < uids.length; i++) {
+        records.push({
+            uid: uids[i],
+            summary: summaries[i],
+            calendar: calendarName,
+            start: iso(starts[i]),
+            end: iso(ends[i]),
+            location: locations[i] || null,
+            modified: iso(modified[i]),
+        });
+    }
+}
+
+function selectedCalendars(app, params) {
+    return params.calendars ? params.calendars.map(function (name) {
+        return app.calendars.byName(name);
+    }) : app.calendars();
+}
+
+function events(params) {
+    const app = Application("Calendar");
+    const records = [];
+
+    selectedCalendars(app, params).forEach(function (calendar) {
+        eventRecords(eventsBetween(calendar, params), calendar.name(), records);
+    });
+    return records;
+}
+
+// Every event uid between params.start and params.end (ms), and the full records of
+// those modified after params.since (ms)
+function eventChanges(params) {
+    const app = Application("Calendar");
+    const since = params.since ? new Date(params.since) : null;
+    const uids = [];
+    const records = [];
+
+    selectedCalendars(app, params).forEach(function (calendar) {
+        const items = eventsBetween(calendar, params);
+        Array.prototype.push.apply(uids, items.uid());
+        const changed = since ? items.whose({stampDate: {_greaterThan: since}}) : items;
+        eventRecords(changed, calendar.name(), records);
+    });
+    return {uids: uids, records: records};
+}
+
+const methods = {
+    ping: function () { return "pong"; },
+    reminders: reminders,
+    reminder_changes: reminderChanges,
+    events: events,
+    event_changes: eventChanges,
+};
+
+//----------------------------------------------------------------------------
+// Request loop
+//----------------------------------------------------------------------------
+
+function handle(line) {
+    let request;
+    try {
+        request = JSON.parse(line);
+    } catch (e) {
+        send({id: null, error: "Bad request: " + e});
+        return;
+    }
+    const method = methods[request.method];
+    if (!method) {
+        send({id: request.id, error: "Unknown method: " + request.method});
+        return;
+    }
+    try {
+        send({id: request.id, result: method(request.params || {})});
+    } catch (e) {
+        send({id: request.id, error: String(e)});
+    }
+}
+
+function run() {
+    let buffer = "";
+    while (true) {
+        const chunk = readChunk();
+        if (chunk === null) {
+            return;
+        }
+        buffer += chunk;
+        let newline;
+        while ((newline = buffer.indexOf("\n")) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (line) {
+                handle(line);
+            }
+        }
+    }
+}
@@ -0,0 +1,109 @@
+"""
+FAISS index types on synthetic vectors: flat vs. IVF-PQ vs. HNSW.
+
+Vectors are drawn around random cluster centres in a low-dimensional space and projected
+to the full dimension, like embeddings of related chunks (which use far fewer directions
+than they have dimensions). The exact neighbours of every query are found with a flat
+index first. Each index type is then built in a fresh process, which reports its build
+time, the latency of single queries (p50 and p99), the size of the index and the resident
+memory it added, and its recall@k against the exact neighbours.
+
+Usage:
+    python benchmarks/bench_ann.py --vectors 100000 --dim 384 --queries 1000 --k 10
+"""
+
+import os
+import sys
+import time
+import argparse
+import subprocess
+import tempfile
+
+import numpy as np
+import psutil
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def rss_mb():
+    return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+def synthetic_vectors(n, dim, clusters=256, latent=48, seed=0):
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, latent))
+    points = centres[rng.integers(0, clusters, size=n)] + 0.7 * rng.standard_normal((n, latent))
+    projection = rng.standard_normal((latent, dim)) / np.sqrt(latent)
+    vectors = points @ projection + 0.05 * rng.standard_normal((n, dim))
+    return vectors.astype(np.float32)
+
+
+def run_kind(kind, data_dir, k):
+    import faiss
+    from ann_index import build_index
+
+    vectors = np.load(os.path.join(data_dir, "vectors.npy"))
+    queries = np.load(os.path.join(data_dir, "queries.npy"))
+    truth = np.load(os.path.join(data_dir, "truth.npy"))
+    baseline = rss_mb()
+
+    start = time.perf_counter()
+    index = build_index(kind, vectors)
+    build_s = time.perf_counter() - start
+
+    latencies = []
+    found = np.empty((len(queries), k), dtype=np.int64)
+    for i, q in enumerate(queries):
+        t = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - t)
+        found[i] = ids[0]
+
+    recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+    size_mb = faiss.serialize_index(index).nbytes / (1024 * 1024)
+    p50, p99 = np.percentile(latencies, [50, 99]) * 1000
+    print(f"{kind:>6}: build {build_s:6.2f}s  p50 {p50:6.3f} ms  p99 {p99:6.3f} ms  "
+          f"index {size_mb:7.1f} MB  +RSS {rss_mb() - baseline:7.1f} MB  recall@{k} {recall:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--types", default="flat,ivfpq,hnsw")
+    parser.add_argument("--kind")
+    parser.add_argument("--data")
+    args = parser.parse_args()
+
+    if args.kind:
+        run_kind(args.kind, args.data, args.k)
+        return
+
+    import faiss
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data = synthetic_vectors(args.vectors + args.queries, args.dim)
+        vectors, queries = data[:args.vectors], data[args.vectors:]
+
+        # Exact neighbours of the queries
+        flat = faiss.IndexFlatL2(args.dim)
+        flat.add(vectors)
+        _, truth = flat.search(queries, args.k)
+        del flat
+
+        np.save(os.path.join(tmp, "vectors.npy"), vectors)
+        np.save(os.path.join(tmp, "queries.npy"), queries)
+        np.save(os.path.join(tmp, "truth.npy"), truth)
+        print(f"Synthetic vectors: {args.vectors} x {args.dim}, {args.queries} queries, k={args.k}")
+
+        for kind in args.types.split(","):
+            subprocess.run(
+                [sys.executable, __file__, "--kind", kind, "--data", tmp, "--k", str(args.k)],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
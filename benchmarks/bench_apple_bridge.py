@@ -0,0 +1,61 @@
+"""
+Per-call latency: a helper process started for every call vs. one long-lived helper.
+
+Uses the stand-in helper (fake_apple_helper.py) by default, so it shows the cost of the
+process start and of the protocol; pass --real on macOS to talk to Reminders itself.
+
+Usage:
+    python benchmarks/bench_apple_bridge.py --calls 50 --reminders 1000
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from apple_bridge import AppleBridge, HELPER_COMMAND
+
+FAKE_HELPER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_apple_helper.py")
+
+
+def measure(name, call, n_calls):
+    times = []
+    for _ in range(n_calls):
+        start = time.perf_counter()
+        records = call()
+        times.append((time.perf_counter() - start) * 1000)
+    print(f"{name:>20}: {len(records):6d} records, median {statistics.median(times):8.1f} ms, "
+          f"max {max(times):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--reminders", type=int, default=1000)
+    parser.add_argument("--real", action="store_true", help="use apple_helper.js through osascript")
+    args = parser.parse_args()
+
+    if args.real:
+        command = HELPER_COMMAND
+    else:
+        command = [sys.executable, FAKE_HELPER, "--reminders", str(args.reminders)]
+
+    def one_shot():
+        bridge = AppleBridge(command)
+        try:
+            return bridge.call("reminders", include_completed=True)
+        finally:
+            bridge.close()
+
+    bridge = AppleBridge(command)
+    bridge.call("ping")  # started once, before timing
+    measure("process per call", one_shot, args.calls)
+    measure("long-lived helper", lambda: bridge.call("reminders", include_completed=True), args.calls)
+    bridge.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Cold-start time and per-turn prompt size: loading the whole history vs. a recent window.
+
+A temporary chat_history.db is filled with synthetic turns, then both ways of loading it
+are timed and the tokens of the history that would go into every prompt are counted.
+
+Usage:
+    python benchmarks/bench_chat_history.py --turns 20000
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chat_store import ChatHistoryStore, count_tokens
+
+WORDS = "tuna nap meow reminder calendar note deadline project human cat chaos sarcasm".split()
+
+
+def fill(store, n_turns, seed=0):
+    rng = random.Random(seed)
+    for _ in range(n_turns):
+        question = " ".join(rng.choice(WORDS) for _ in range(rng.randint(5, 30)))
+        answer = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 120)))
+        store.save_turn(question, answer)
+
+
+def measure(name, load):
+    start = time.perf_counter()
+    history = load()
+    elapsed = (time.perf_counter() - start) * 1000
+    tokens = sum(count_tokens(m.content) for m in history)
+    print(f"{name:>22}: {len(history):6d} messages, {elapsed:8.1f} ms, {tokens:8d} prompt tokens")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=20000)
+    parser.add_argument("--window-turns", type=int, default=20)
+    parser.add_argument("--window-tokens", type=int, default=3000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "chat_history.db")
+        store = ChatHistoryStore(db_path)
+        fill(store, args.turns)
+        store.close()
+
+        store = ChatHistoryStore(db_path)
+        measure("full history", store.load_history)
+        measure(f"last {args.window_turns} turns", lambda: store.load_recent(max_turns=args.window_turns))
+        measure(f"{args.window_tokens} token budget", lambda: store.load_recent(max_tokens=args.window_tokens))
+        oldest = store.load_recent(max_turns=args.window_turns)[0]
+        measure("previous page", lambda: store.load_before(oldest.id, max_turns=args.window_turns))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Time to extract the text of a large PDF: serial pdfplumber vs. a pool of worker processes.
+
+Usage:
+    python benchmarks/bench_pdf_extract.py --pages 400 --workers 8
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_pdf import write_synthetic_pdf
+from pdf_ingest import iter_pdf_pages, iter_pdf_pages_parallel
+
+
+def timed(pages):
+    start = time.perf_counter()
+    n_chars = sum(len(doc.page_content) for doc in pages)
+    return time.perf_counter() - start, n_chars
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = write_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), args.pages)
+
+        serial_time, serial_chars = timed(iter_pdf_pages(pdf_path))
+        print(f"  serial: {serial_time:.1f}s")
+
+        parallel_time, parallel_chars = timed(iter_pdf_pages_parallel(pdf_path, workers=args.workers))
+        print(f"parallel: {parallel_time:.1f}s with {args.workers} workers "
+              f"({serial_time / parallel_time:.1f}x)")
+
+        assert serial_chars == parallel_chars, "parallel extraction returned different text"
+
+
+if __name__ == "__main__":
+    main()
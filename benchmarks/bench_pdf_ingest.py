@@ -0,0 +1,80 @@
+"""
+Peak memory of PDF ingestion: whole-document loading vs. streaming windows.
+
+Each mode runs in a fresh process on the same synthetic PDF and reports its peak RSS.
+Embeddings come from DeterministicFakeEmbedding, so no API key is needed.
+
+Usage:
+    python benchmarks/bench_pdf_ingest.py --pages 3000 --window 256
+"""
+
+import os
+import sys
+import time
+import argparse
+import resource
+import subprocess
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic_pdf import write_synthetic_pdf
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_mode(mode, pdf_path, window):
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from langchain_community.vectorstores.faiss import FAISS
+
+    embedding = DeterministicFakeEmbedding(size=1536)
+    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+    baseline = peak_rss_mb()
+    start = time.perf_counter()
+
+    if mode == "load":
+        from langchain_community.document_loaders import PDFPlumberLoader
+        docs = PDFPlumberLoader(pdf_path).load()
+        split_docs = splitter.split_documents(docs)
+        vectorstore = FAISS.from_documents(split_docs, embedding=embedding)
+    else:
+        from embedding_scheduler import EmbeddingScheduler
+        from pdf_ingest import build_pdf_index
+        vectorstore = build_pdf_index(pdf_path, splitter, EmbeddingScheduler(embedding), window_size=window)
+
+    elapsed = time.perf_counter() - start
+    print(f"{mode:>6}: {vectorstore.index.ntotal} chunks in {elapsed:.1f}s, "
+          f"peak RSS {peak_rss_mb():.0f} MB (imports {baseline:.0f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--window", type=int, default=256)
+    parser.add_argument("--mode", choices=["load", "stream"])
+    parser.add_argument("--pdf")
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.mode, args.pdf, args.window)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = write_synthetic_pdf(os.path.join(tmp, "synthetic.pdf"), args.pages)
+        size_mb = os.path.getsize(pdf_path) / (1024 * 1024)
+        print(f"Synthetic PDF: {args.pages} pages, {size_mb:.1f} MB")
+        for mode in ("load", "stream"):
+            subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--pdf", pdf_path, "--window", str(args.window)],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
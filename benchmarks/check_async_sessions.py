@@ -0,0 +1,159 @@
+"""
+Concurrency check of the asyncio chat server (chatbox_ASYNC.py) with a fake agent.
+
+The app is built with make_app(get_executor=..., sessions=...), so no model or API key is
+needed: the fake agent sleeps for every turn and records when it started and ended, and the
+sessions get memories without history. Every session sends several messages at once, a
+little apart so their arrival order is known, to /chat or /chat/stream. The check fails unless
+- the turns of each session ran one at a time, in the order they arrived
+- turns of different sessions ran at the same time
+The session manager keeps fewer sessions than there are, so sessions with turns still
+waiting must not be evicted either (a new session object would let a turn jump the queue).
+Last, a stream that ends without the agent's final output must end with an error event.
+Chat history is written to a temporary HOME.
+
+Usage:
+    python benchmarks/check_async_sessions.py --sessions 4 --turns 5 --delay 0.2
+"""
+
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeMemory:
+    def messages(self, user_input):
+        return []
+
+
+class FakeAgent:
+    """Answers every message after delay seconds and records (session, turn, start, end)."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.turns = []
+
+    async def ainvoke(self, inputs):
+        start = time.perf_counter()
+        await asyncio.sleep(self.delay)
+        self.turns.append((*inputs["input"].split(":"), start, time.perf_counter()))
+        return {"output": f"answer to {inputs['input']}"}
+
+    async def astream_events(self, inputs, version="v2"):
+        start = time.perf_counter()
+        yield {"event": "on_chain_start", "run_id": "root", "name": "fake", "data": {}}
+        for _ in range(4):
+            await asyncio.sleep(self.delay / 4)
+            yield {"event": "on_chat_model_stream", "run_id": "model", "name": "fake",
+                   "data": {"chunk": FakeChunk("token ")}}
+        self.turns.append((*inputs["input"].split(":"), start, time.perf_counter()))
+        output = f"answer to {inputs['input']}"
+        yield {"event": "on_chain_end", "run_id": "root", "name": "fake", "data": {"output": {"output": output}}}
+
+
+class UnfinishedAgent:
+    """Streams a token, then stops without the final output of the run."""
+
+    async def astream_events(self, inputs, version="v2"):
+        yield {"event": "on_chain_start", "run_id": "root", "name": "fake", "data": {}}
+        yield {"event": "on_chat_model_stream", "run_id": "model", "name": "fake",
+               "data": {"chunk": FakeChunk("token ")}}
+
+
+class FakeChunk:
+    def __init__(self, content):
+        self.content = content
+
+
+async def send(client, route, session_id, turn, wait):
+    await asyncio.sleep(wait)
+    response = await client.post(route, json={"message": f"{session_id}:{turn}", "session_id": session_id})
+    assert response.status == 200, f"{route} answered {response.status}"
+    body = await response.text()
+    assert f"answer to {session_id}:{turn}" in body, body
+
+
+def check(turns, n_sessions, n_turns):
+    by_session = {}
+    for session_id, turn, start, end in turns:
+        by_session.setdefault(session_id, []).append((start, end, int(turn)))
+    assert len(by_session) == n_sessions, f"{len(by_session)} sessions answered, expected {n_sessions}"
+
+    for session_id, runs in by_session.items():
+        runs.sort()
+        order = [turn for _, _, turn in runs]
+        assert order == list(range(n_turns)), f"session {session_id} ran its turns in the order {order}"
+        for (_, end, _), (start, _, turn) in zip(runs, runs[1:]):
+            assert start >= end, f"turn {turn} of session {session_id} started before the previous one ended"
+
+    # Most turns running at the same moment
+    edges = sorted([(start, 1) for _, _, start, _ in turns] + [(end, -1) for _, _, _, end in turns])
+    running = peak = 0
+    for _, step in edges:
+        running += step
+        peak = max(peak, running)
+    assert peak > 1, "turns of different sessions never overlapped"
+    return peak
+
+
+async def run(route, args):
+    from aiohttp.test_utils import TestClient, TestServer
+    from chat_sessions import SessionManager
+    from chatbox_ASYNC import make_app
+
+    agent = FakeAgent(args.delay)
+    sessions = SessionManager(lambda session_id: FakeMemory(), max_sessions=args.max_sessions)
+    app = make_app(get_executor=lambda: agent, sessions=sessions)
+
+    async with TestClient(TestServer(app)) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            send(client, route, f"s{s}", turn, wait=(turn * args.sessions + s) * args.stagger)
+            for s in range(args.sessions)
+            for turn in range(args.turns)
+        ])
+        elapsed = time.perf_counter() - start
+
+    peak = check(agent.turns, args.sessions, args.turns)
+    serial = args.sessions * args.turns * args.delay
+    print(f"{route:>13}: {len(agent.turns)} turns in {elapsed:.2f}s ({serial:.2f}s one after another), "
+          f"up to {peak} at once, order kept in every session")
+
+
+async def run_unfinished():
+    from aiohttp.test_utils import TestClient, TestServer
+    from chat_sessions import SessionManager
+    from chatbox_ASYNC import make_app
+
+    agent = UnfinishedAgent()
+    app = make_app(get_executor=lambda: agent, sessions=SessionManager(lambda session_id: FakeMemory()))
+    async with TestClient(TestServer(app)) as client:
+        response = await client.post("/chat/stream", json={"message": "hello", "session_id": "s0"})
+        body = await response.text()
+    assert "event: error" in body and "event: done" not in body, body
+    print(" unfinished stream: ends with an error event")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--delay", type=float, default=0.2, help="seconds the fake agent takes per turn")
+    parser.add_argument("--stagger", type=float, default=0.005, help="seconds between two messages being sent")
+    parser.add_argument("--max-sessions", type=int, default=2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as home:
+        os.environ["HOME"] = home  # chat_store puts chat_history.db under ~/Library
+        for route in ("/chat", "/chat/stream"):
+            asyncio.run(run(route, args))
+        asyncio.run(run_unfinished())
+
+
+if __name__ == "__main__":
+    main()
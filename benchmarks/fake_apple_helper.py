@@ -0,0 +1,123 @@
+"""
+Stand-in for apple_helper.js that runs anywhere.
+
+Speaks the same line-delimited JSON protocol and serves synthetic reminders and calendar
+events, so AppleBridge can be exercised without macOS. Two extra methods change the data
+while it runs: "_touch" {"id", "name"} renames (and so modifies) a reminder or event, and
+"_delete" {"id"} removes one.
+
+Usage:
+    AppleBridge(command=[sys.executable, "benchmarks/fake_apple_helper.py", "--reminders", "500"])
+"""
+
+import sys
+import json
+import random
+import argparse
+import datetime
+
+WORDS = "tuna nap meow vet groceries report call mum deadline project litter brush".split()
+
+
+def make_reminders(n, seed=0):
+    rng = random.Random(seed)
+    base = datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc)
+    lists = ["Reminders", "Work", "Home", "Shopping"]
+    return [
+        {
+            "id": f"x-apple-reminder://{i:06d}",
+            "name": " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 6))),
+            "list": rng.choice(lists),
+            "completed": rng.random() < 0.5,
+            "due": None,
+            "modified": (base + datetime.timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(n)
+    ]
+
+
+def make_events(n, seed=0):
+    rng = random.Random(seed)
+    today = datetime.datetime.now(datetime.timezone.utc).replace(hour=8, minute=0, second=0, microsecond=0)
+    events = []
+    for i in range(n):
+        start = today + datetime.timedelta(minutes=30 * rng.randint(0, 24))
+        events.append({
+            "uid": f"event-{i:06d}",
+            "summary": " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4))),
+            "calendar": "Home",
+            "start": start.isoformat(),
+            "end": (start + datetime.timedelta(minutes=30)).isoformat(),
+            "location": None,
+            "modified": "2026-01-01T00:00:00+00:00",
+        })
+    return events
+
+
+def _after(record, since):
+    # since is in milliseconds, like the dates sent by AppleBridge callers
+    if not since:
+        return True
+    return datetime.datetime.fromisoformat(record["modified"]).timestamp() * 1000 > since
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--reminders", type=int, default=100)
+    parser.add_argument("--events", type=int, default=10)
+    args = parser.parse_args()
+
+    reminders = make_reminders(args.reminders)
+    events = make_events(args.events)
+
+    def handle(method, params):
+        if method == "ping":
+            return "pong"
+        if method == "reminders":
+            return [
+                r for r in reminders
+                if (not params.get("list_name") or r["list"] == params["list_name"])
+                and (params.get("include_completed") or not r["completed"])
+            ]
+        if method == "reminder_changes":
+            return {
+                "ids": [r["id"] for r in reminders],
+                "records": [r for r in reminders if _after(r, params.get("since"))],
+            }
+        if method == "events":
+            calendars = params.get("calendars")
+            return [e for e in events if not calendars or e["calendar"] in calendars]
+        if method == "event_changes":
+            calendars = params.get("calendars")
+            selected = [e for e in events if not calendars or e["calendar"] in calendars]
+            return {
+                "uids": [e["uid"] for e in selected],
+                "records": [e for e in selected if _after(e, params.get("since"))],
+            }
+        if method == "_touch":
+            now = datetime.datetime.now(datetime.timezone.utc).isoformat()
+            for record in reminders + events:
+                if params["id"] in (record.get("id"), record.get("uid")):
+                    record["name" if "id" in record else "summary"] = params["name"]
+                    record["modified"] = now
+            return True
+        if method == "_delete":
+            reminders[:] = [r for r in reminders if r["id"] != params["id"]]
+            events[:] = [e for e in events if e["uid"] != params["id"]]
+            return True
+        raise ValueError(f"Unknown method: {method}")
+
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        request = json.loads(line)
+        try:
+            answer = {"id": request["id"], "result": handle(request["method"], request.get("params") or {})}
+        except Exception as e:
+            answer = {"id": request["id"], "error": str(e)}
+        sys.stdout.write(json.dumps(answer) + "\n")
+        sys.stdout.flush()
+
+
+if __name__ == "__main__":
+    main()
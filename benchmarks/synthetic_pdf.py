@@ -0,0 +1,56 @@
+"""
+Writes large synthetic PDFs for the ingestion benchmarks.
+Only plain text pages are written, so no PDF library is needed.
+"""
+
+import random
+
+WORDS = (
+    "majid cat tuna nap chaos reminder calendar note report chapter section figure table "
+    "value result method analysis data summary meeting deadline project budget review"
+).split()
+
+
+def _page_lines(rng, n_lines, words_per_line):
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_line)) for _ in range(n_lines)]
+
+
+def write_synthetic_pdf(path, n_pages, n_lines=45, words_per_line=12, seed=0):
+    """Write a PDF with n_pages pages of random words and return its path."""
+    rng = random.Random(seed)
+    objects = []  # object bodies, object number = index + 1
+
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(None)  # pages tree, written once the page objects are known
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    page_numbers = []
+    for _ in range(n_pages):
+        lines = _page_lines(rng, n_lines, words_per_line)
+        text = " T* ".join(f"({line}) Tj" for line in lines)
+        stream = f"BT /F1 10 Tf 14 TL 40 800 Td {text} ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_number = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_number
+        )
+        page_numbers.append(len(objects))
+
+    kids = " ".join(f"{n} 0 R" for n in page_numbers)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {n_pages} >>".encode("latin-1")
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref_offset = f.tell()
+        f.write(b"xref\n0 %d\n" % (len(objects) + 1))
+        f.write(b"0000000000 65535 f \n")
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\n" % (len(objects) + 1))
+        f.write(b"startxref\n%d\n%%%%EOF\n" % xref_offset)
+    return path
@@ -0,0 +1,209 @@
+"""
+HTML page of the Majid web chat, served by both the Flask and the asyncio chat servers.
+"""
+
+#--------------------------------------------------
+# HTML template
+#--------------------------------------------------
+HTML = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>😼 Majid - Your Cat Assistant</title>
+    <style>
+        body {
+            font-family: Helvetica, sans-serif;
+            background-color: #2B2B2B;
+            color: white;
+            display: flex;
+            justify-content: center;
+            align-items: center;
+            height: 100vh;
+            margin: 0;
+        }
+
+        .container {
+            width: 600px;
+            max-width: 90%;
+            background-color: #1E1E1E;
+            padding: 20px;
+            border-radius: 15px;
+            display: flex;
+            flex-direction: column;
+            height: 90vh;
+            box-sizing: border-box;
+        }
+
+        #chat_box {
+            flex: 1;
+            overflow-y: auto;
+            background-color: #2B2B2B;
+            padding: 10px;
+            border-radius: 10px;
+            margin-bottom: 10px;
+            word-wrap: break-word;
+            overflow-wrap: break-word;
+        }
+
+        .message {
+            margin: 5px 0;
+            padding: 8px 12px;
+            border-radius: 10px;
+            white-space: pre-wrap;
+            word-wrap: break-word;
+            overflow-wrap: break-word;
+        }
+
+        .user {
+            background-color: #444;
+            color: yellow;
+            text-align: right;
+        }
+
+        .ai {
+            background-color: #333;
+            color: white;
+            text-align: left;
+        }
+
+        #entry_box {
+            width: 100%;
+            height: 60px;
+            padding: 10px;
+            border-radius: 10px;
+            border: none;
+            resize: none;
+            background-color: #1E1E1E;
+            color: white;
+            box-sizing: border-box;
+            margin-bottom: 10px;
+            overflow-y: auto;
+        }
+
+        button {
+            padding: 10px 20px;
+            border: none;
+            border-radius: 10px;
+            background-color: #FFB347;
+            color: black;
+            font-weight: bold;
+            cursor: pointer;
+            align-self: flex-end;
+        }
+
+        button:hover {
+            background-color: #e6a03c;
+        }
+
+        .status {
+            color: #aaa;
+            font-style: italic;
+            font-size: 0.9em;
+        }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <h2>Chat with Majid</h2>
+        <div id="chat_box"></div>
+        <textarea id="entry_box" placeholder="Type a message..."></textarea>
+        <button onclick="sendMessage()">🐾 Send</button>
+    </div>
+
+    <script>
+        // One conversation per browser, kept across visits
+        let sessionId = localStorage.getItem("majid_session");
+        if (!sessionId) {
+            sessionId = window.crypto && crypto.randomUUID ? crypto.randomUUID() : Date.now() + "-" + Math.random();
+            localStorage.setItem("majid_session", sessionId);
+        }
+
+        async function sendMessage() {
+            let text = document.getElementById("entry_box").value.trim();
+            if (!text) return;
+            appendMessage("user", text);
+            document.getElementById("entry_box").value = "";
+
+            const response = await fetch("/chat/stream", {
+                method: "POST",
+                headers: { "Content-Type": "application/json" },
+                body: JSON.stringify({ message: text, session_id: sessionId })
+            });
+
+            // Read the Server-Sent Events and render the answer as it is written
+            const div = appendMessage("ai", "");
+            const status = document.createElement("div");
+            status.className = "status";
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = "";
+            let answer = "";
+
+            while (true) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                let end;
+                while ((end = buffer.indexOf("\\n\\n")) >= 0) {
+                    const frame = buffer.slice(0, end);
+                    buffer = buffer.slice(end + 2);
+                    let event = "message", data = "";
+                    for (const line of frame.split("\\n")) {
+                        if (line.startsWith("event: ")) event = line.slice(7);
+                        else if (line.startsWith("data: ")) data += line.slice(6);
+                    }
+                    const payload = JSON.parse(data);
+
+                    if (event === "token") {
+                        answer += payload.text;
+                        setMessage(div, answer);
+                    } else if (event === "tool_start") {
+                        status.textContent = "🐾 Majid is using " + payload.tool + "...";
+                        div.appendChild(status);
+                    } else if (event === "tool_end") {
+                        status.remove();
+                    } else if (event === "done") {
+                        setMessage(div, payload.response);
+                    } else if (event === "error") {
+                        setMessage(div, "Error: " + payload.message);
+                    }
+                }
+            }
+        }
+
+        function escapeHtml(unsafe) {
+            return unsafe
+                .replace(/&/g, "&amp;")
+                .replace(/</g, "&lt;")
+                .replace(/>/g, "&gt;")
+                .replace(/"/g, "&quot;")
+                .replace(/'/g, "&#039;");
+        }
+
+        function appendMessage(sender, text) {
+            const chatBox = document.getElementById("chat_box");
+            const div = document.createElement("div");
+            div.className = "message " + sender;
+            div.innerHTML = escapeHtml(text);
+            chatBox.appendChild(div);
+            chatBox.scrollTop = chatBox.scrollHeight;
+            return div;
+        }
+
+        function setMessage(div, text) {
+            div.innerHTML = escapeHtml(text);
+            const chatBox = document.getElementById("chat_box");
+            chatBox.scrollTop = chatBox.scrollHeight;
+        }
+
+        document.getElementById("entry_box").addEventListener("keydown", function(event) {
+            if (event.key === "Enter" && !event.shiftKey) {
+                event.preventDefault();
+                sendMessage();
+            }
+        });
+    </script>
+</body>
+</html>
+"""
@@ -0,0 +1,83 @@
+"""
+Per-session conversation state for the chat servers.
+
+Each session has its own conversation memory (history scoped to the session in SQLite),
+an asyncio lock for the async server and a thread lock for Flask: turns of one session run
+one after another in the order they arrived, while different sessions run concurrently.
+Idle sessions are evicted least recently used first; their history stays in the database
+and is loaded again if the session comes back. A session counts as in use from get() until
+release(), including while a request waits for its lock, and is never evicted in that time.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import asyncio
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+#----------------------------------------------------------------------------
+# Sessions
+#----------------------------------------------------------------------------
+
+class ChatSession:
+    """State of one conversation while it is in memory."""
+
+    def __init__(self, session_id, memory):
+        self.session_id = session_id
+        self.memory = memory
+        self.lock = asyncio.Lock()             # held for a whole turn by the async server
+        self.thread_lock = threading.Lock()    # held for a whole turn by the Flask server
+        self.users = 0                         # requests between get() and release(), guarded by the manager lock
+
+    def busy(self):
+        return self.users > 0
+
+
+class SessionManager:
+    """
+    Creates sessions on first use and keeps at most max_sessions of them.
+    make_memory(session_id) builds the ConversationMemory of a new session.
+    Every get() must be paired with a release() once the turn is over; use() does both.
+    """
+
+    def __init__(self, make_memory, max_sessions=100):
+        self.make_memory = make_memory
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, session_id):
+        with self.lock:
+            session = self.sessions.get(session_id)
+            if session is None:
+                session = ChatSession(session_id, self.make_memory(session_id))
+                self.sessions[session_id] = session
+            session.users += 1
+            self.sessions.move_to_end(session_id)
+            self._evict()
+            return session
+
+    def release(self, session):
+        with self.lock:
+            session.users -= 1
+            self._evict()
+
+    @contextmanager
+    def use(self, session_id):
+        """The session of session_id, kept in memory until the with block ends."""
+        session = self.get(session_id)
+        try:
+            yield session
+        finally:
+            self.release(session)
+
+    def _evict(self):
+        # Least recently used first, skipping sessions that requests are using or waiting for
+        for session_id in list(self.sessions):
+            if len(self.sessions) <= self.max_sessions:
+                return
+            if not self.sessions[session_id].busy():
+                del self.sessions[session_id]
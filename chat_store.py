@@ -0,0 +1,279 @@
+"""
+Chat history storage in SQLite.
+
+One long-lived connection in WAL mode is shared by every thread (Flask workers, the Tk
+chatbox, the menu bar) behind a lock. Both messages of a turn are written in a single
+transaction, and with background=True the writes go through a queue drained by a writer
+thread, so the request path never waits on the disk.
+
+History is read in windows: the most recent turns (or a token budget's worth) for the
+prompt, and older pages only when they are asked for.
+Every message belongs to a session, so several conversations can share the database.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import queue
+import sqlite3
+import datetime
+import threading
+import tiktoken
+from langchain_core.messages import HumanMessage, AIMessage
+
+#----------------------------------------------------------------------------
+# Database location
+#----------------------------------------------------------------------------
+
+user_dir = os.path.expanduser("~/Library/Application Support/Majid")
+DB_PATH = os.path.join(user_dir, "chat_history.db")
+DEFAULT_SESSION = "default"
+
+# Rows read from SQLite at a time while filling a token budget
+_PAGE_ROWS = 64
+
+_encoding = None
+
+def count_tokens(text):
+    """Number of tokens of text for the chat models."""
+    global _encoding
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding("cl100k_base")
+    return len(_encoding.encode(text, disallowed_special=()))
+
+
+def _to_message(row_id, role, msg):
+    # The row id travels with the message, so the memory knows how far it has summarized
+    # and older pages can be loaded before it
+    if role == "human":
+        return HumanMessage(content=msg, id=str(row_id))
+    return AIMessage(content=msg, id=str(row_id))
+
+#----------------------------------------------------------------------------
+# Chat history store
+#----------------------------------------------------------------------------
+
+class ChatHistoryStore:
+    """Thread-safe access to the history table."""
+
+    def __init__(self, db_path=DB_PATH, background=False):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")  # safe with WAL, one fsync per checkpoint
+
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    role TEXT NOT NULL,
+                    message TEXT NOT NULL,
+                    timestamp TEXT NOT NULL,
+                    session_id TEXT NOT NULL DEFAULT 'default'
+                )
+            ''')
+            # Databases made before sessions existed: their messages join the default session
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(history)")]
+            if "session_id" not in columns:
+                self.conn.execute("ALTER TABLE history ADD COLUMN session_id TEXT NOT NULL DEFAULT 'default'")
+            # Nothing reads history by time; the index only slowed down writes
+            self.conn.execute("DROP INDEX IF EXISTS idx_history_timestamp")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_history_session ON history (session_id, id)")
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS summaries (
+                    name TEXT PRIMARY KEY,
+                    upto_id INTEGER NOT NULL,
+                    summary TEXT NOT NULL,
+                    timestamp TEXT NOT NULL
+                )
+            ''')
+
+        self.listeners = []
+
+        # Optional background writer
+        self.queue = None
+        self.writer = None
+        if background:
+            self.queue = queue.Queue()
+            self.writer = threading.Thread(target=self._writer_loop, name="chat-history-writer", daemon=True)
+            self.writer.start()
+
+    #********** Writing **********
+
+    def _write(self, rows):
+        with self.lock, self.conn:  # one transaction for all rows
+            self.conn.executemany(
+                "INSERT INTO history (session_id, role, message, timestamp) VALUES (?, ?, ?, ?)", rows
+            )
+
+    def _writer_loop(self):
+        while True:
+            rows = self.queue.get()
+            if rows is None:
+                self.queue.task_done()
+                return
+
+            # Coalesce whatever else is already waiting into the same transaction
+            batch = list(rows)
+            taken = 1
+            stop = False
+            while True:
+                try:
+                    more = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if more is None:
+                    stop = True
+                    break
+                batch.extend(more)
+
+            try:
+                self._write(batch)
+            except Exception as e:
+                print(f"Error saving chat history: {e}")
+            finally:
+                for _ in range(taken):
+                    self.queue.task_done()
+            # after task_done, so flush() does not wait for slow listeners
+            self._notify()
+            if stop:
+                return
+
+    def _submit(self, rows):
+        if self.queue is not None:
+            self.queue.put(rows)
+        else:
+            self._write(rows)
+            self._notify()
+
+    def add_listener(self, listener):
+        """Call listener(store) after new messages are written, e.g. to index them."""
+        self.listeners.append(listener)
+
+    def _notify(self):
+        for listener in self.listeners:
+            try:
+                listener(self)
+            except Exception as e:
+                print(f"Error in chat history listener: {e}")
+
+    def save_message(self, role, message, session_id=DEFAULT_SESSION):
+        timestamp = datetime.datetime.now().isoformat()
+        self._submit([(session_id, role, message, timestamp)])
+
+    def save_turn(self, human_message, ai_message, session_id=DEFAULT_SESSION):
+        """Save the human and AI messages of one turn together."""
+        timestamp = datetime.datetime.now().isoformat()
+        self._submit([
+            (session_id, "human", human_message, timestamp),
+            (session_id, "ai", ai_message, timestamp),
+        ])
+
+    def flush(self):
+        """Wait until every queued message is on disk."""
+        if self.queue is not None:
+            self.queue.join()
+
+    def close(self):
+        if self.writer is not None and self.writer.is_alive():
+            self.queue.put(None)
+            self.writer.join()
+        with self.lock:
+            self.conn.close()
+
+    #********** Reading **********
+
+    def load_history(self, session_id=DEFAULT_SESSION):
+        """Every stored message of a session, oldest first."""
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, role, message FROM history WHERE session_id = ? ORDER BY id ASC", (session_id,)
+            ).fetchall()
+        return [_to_message(*row) for row in rows]
+
+    def load_recent(self, max_turns=None, max_tokens=None, before_id=None, after_id=None,
+                    session_id=DEFAULT_SESSION):
+        """
+        The most recent messages of a session, oldest first.
+        - max_turns: at most this many human/AI turns
+        - max_tokens: stop before the messages exceed this many tokens
+        - before_id: only messages older than this row id, to page back in time
+        - after_id: only messages newer than this row id
+        The window always starts with a human message.
+        """
+        self.flush()
+        limit = 2 * max_turns if max_turns is not None else -1
+        before_id = before_id if before_id is not None else (1 << 62)
+        after_id = after_id if after_id is not None else 0
+
+        with self.lock:
+            cursor = self.conn.execute(
+                "SELECT id, role, message FROM history "
+                "WHERE session_id = ? AND id < ? AND id > ? ORDER BY id DESC LIMIT ?",
+                (session_id, before_id, after_id, limit),
+            )
+            rows = []
+            used_tokens = 0
+            while True:
+                page = cursor.fetchmany(_PAGE_ROWS)
+                if not page:
+                    break
+                full = False
+                for row in page:
+                    if max_tokens is not None:
+                        used_tokens += count_tokens(row[2])
+                        if used_tokens > max_tokens:
+                            full = True
+                            break
+                    rows.append(row)
+                if full:
+                    break
+            cursor.close()
+
+        rows.reverse()
+        while rows and rows[0][1] != "human":
+            rows.pop(0)
+        return [_to_message(*row) for row in rows]
+
+    def load_after(self, after_id, limit=500):
+        """
+        Raw (id, role, message, session_id) rows of every session newer than after_id, oldest first.
+        Does not flush, so listeners running on the writer thread can call it.
+        """
+        with self.lock:
+            return self.conn.execute(
+                "SELECT id, role, message, session_id FROM history WHERE id > ? ORDER BY id ASC LIMIT ?",
+                (after_id, limit),
+            ).fetchall()
+
+    def load_before(self, before_id, max_turns=10, session_id=DEFAULT_SESSION):
+        """
+        The turns of a session just before the message with row id before_id, oldest first.
+        Pass the id of the oldest message loaded so far to page further back.
+        """
+        return self.load_recent(max_turns=max_turns, before_id=int(before_id), session_id=session_id)
+
+    #********** Conversation summaries **********
+
+    def load_summary(self, name):
+        """(upto_id, summary) of the running summary called name, or (0, "") if there is none."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT upto_id, summary FROM summaries WHERE name = ?", (name,)
+            ).fetchone()
+        return row if row else (0, "")
+
+    def save_summary(self, name, upto_id, summary):
+        timestamp = datetime.datetime.now().isoformat()
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO summaries (name, upto_id, summary, timestamp) VALUES (?, ?, ?, ?)",
+                (name, upto_id, summary, timestamp),
+            )
@@ -0,0 +1,91 @@
+"""
+Streaming of agent answers.
+
+The agent runs on a worker thread with a callback handler that pushes LLM tokens and tool
+progress into a queue; stream_chat turns that queue into a generator of events that the
+web chatbox sends to the browser as Server-Sent Events.
+Time to first token is measured for every answer.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import json
+import time
+import queue
+import threading
+from langchain_core.callbacks import BaseCallbackHandler
+
+_DONE = object()
+
+#----------------------------------------------------------------------------
+# Callback handler
+#----------------------------------------------------------------------------
+
+class QueueCallbackHandler(BaseCallbackHandler):
+    """Puts (event, data) pairs for tokens and tool calls into a queue."""
+
+    def __init__(self, events):
+        self.events = events
+
+    def on_llm_new_token(self, token, **kwargs):
+        if token:
+            self.events.put(("token", {"text": token}))
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        self.events.put(("tool_start", {"tool": name, "input": str(input_str)[:200]}))
+
+    def on_tool_end(self, output, **kwargs):
+        self.events.put(("tool_end", {"tool": kwargs.get("name") or "tool"}))
+
+#----------------------------------------------------------------------------
+# Streaming
+#----------------------------------------------------------------------------
+
+def stream_chat(agentExecutor, question, history):
+    """
+    Run the agent and yield (event, data) pairs as they happen:
+    token, tool_start, tool_end, then done with the full answer and timings, or error.
+    """
+    events = queue.Queue()
+    result = {}
+    start = time.perf_counter()
+
+    def run():
+        try:
+            response = agentExecutor.invoke(
+                {"input": question, "chat_history": history},
+                config={"callbacks": [QueueCallbackHandler(events)]},
+            )
+            result["output"] = response["output"]
+        except Exception as e:
+            result["error"] = str(e)
+        finally:
+            events.put(_DONE)
+
+    threading.Thread(target=run, name="agent-stream", daemon=True).start()
+
+    first_token_ms = None
+    while True:
+        item = events.get()
+        if item is _DONE:
+            break
+        if item[0] == "token" and first_token_ms is None:
+            first_token_ms = (time.perf_counter() - start) * 1000
+        yield item
+
+    total_ms = (time.perf_counter() - start) * 1000
+    if "error" in result:
+        yield "error", {"message": result["error"]}
+        return
+
+    ttft = f"{first_token_ms:.0f} ms" if first_token_ms is not None else "no tokens"
+    print(f"Time to first token: {ttft}, full answer: {total_ms:.0f} ms")
+    yield "done", {"response": result["output"], "first_token_ms": first_token_ms, "total_ms": total_ms}
+
+
+def sse_format(event, data):
+    """One Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
@@ -0,0 +1,167 @@
+"""
+Asyncio chat server for Majid.
+
+Serves the same page and routes as chatbox_WEB.py (/, /chat and /chat/stream), but with
+aiohttp and AgentExecutor.ainvoke / astream_events, so several conversations are answered
+at the same time. Requests carry a session_id (or fall back to a session cookie); the turns
+of one session are serialized by the session lock, so a second message waits for the first answer.
+"""
+
+#--------------------------------------------------
+# Include packages
+#--------------------------------------------------
+import sys
+import time
+import asyncio
+import uuid
+import webbrowser
+
+print("\nRunning chatbox_ASYNC with:", sys.executable)
+print("Frozen:", getattr(sys, "frozen", False))
+print('\n')
+
+from langchain_functions import *
+from aiohttp import web
+from chat_page import HTML
+from chat_sessions import SessionManager
+from chat_streaming import sse_format
+
+SESSION_COOKIE = "majid_session"
+
+#--------------------------------------------------
+# Helpers
+#--------------------------------------------------
+
+def session_for(request, data):
+    """The session of the request, as a context manager that keeps it in memory until the turn is over."""
+    session_id = data.get("session_id") or request.cookies.get(SESSION_COOKIE) or DEFAULT_SESSION
+    return request.app["sessions"].use(session_id)
+
+
+async def read_message(request):
+    data = await request.json()
+    return data, data.get("message", "").strip()
+
+#--------------------------------------------------
+# Routes
+#--------------------------------------------------
+
+async def index(request):
+    response = web.Response(text=HTML, content_type="text/html")
+    if SESSION_COOKIE not in request.cookies:
+        response.set_cookie(SESSION_COOKIE, uuid.uuid4().hex, httponly=True, samesite="Strict")
+    return response
+
+
+async def chat(request):
+    data, user_input = await read_message(request)
+    if not user_input:
+        return web.json_response({"response": ""})
+
+    with session_for(request, data) as session:
+        async with session.lock:
+            # the memory reads SQLite and may call the summarizer, so keep it off the event loop
+            history = await asyncio.to_thread(session.memory.messages, user_input)
+            result = await request.app["get_executor"]().ainvoke({
+                "input": user_input,
+                "chat_history": history,
+            })
+            response = result["output"]
+            save_turn_in_database(user_input, response, session_id=session.session_id)
+
+    return web.json_response({"response": response, "session_id": session.session_id})
+
+
+async def chat_stream(request):
+    data, user_input = await read_message(request)
+
+    stream = web.StreamResponse(headers={"Content-Type": "text/event-stream", "Cache-Control": "no-cache"})
+    await stream.prepare(request)
+
+    async def send(event, payload):
+        await stream.write(sse_format(event, payload).encode("utf-8"))
+
+    if not user_input:
+        await send("done", {"response": ""})
+        return stream
+
+    with session_for(request, data) as session:
+        async with session.lock:
+            start = time.perf_counter()
+            first_token_ms = None
+            response = None
+            root_run_id = None
+
+            try:
+                history = await asyncio.to_thread(session.memory.messages, user_input)
+                events = request.app["get_executor"]().astream_events(
+                    {"input": user_input, "chat_history": history},
+                    version="v2",
+                )
+                async for event in events:
+                    kind = event["event"]
+                    if root_run_id is None:
+                        root_run_id = event["run_id"]
+
+                    if kind == "on_chat_model_stream":
+                        text = event["data"]["chunk"].content
+                        if text:
+                            if first_token_ms is None:
+                                first_token_ms = (time.perf_counter() - start) * 1000
+                            await send("token", {"text": text})
+                    elif kind == "on_tool_start":
+                        await send("tool_start", {"tool": event["name"], "input": str(event["data"].get("input"))[:200]})
+                    elif kind == "on_tool_end":
+                        await send("tool_end", {"tool": event["name"]})
+                    elif kind == "on_chain_end" and event["run_id"] == root_run_id:
+                        response = event["data"]["output"]["output"]
+            except Exception as e:
+                await send("error", {"message": str(e)})
+                return stream
+
+            # A stream that ended without the agent's final output has nothing to save
+            if not isinstance(response, str):
+                await send("error", {"message": "The agent stopped without an answer"})
+                return stream
+
+            save_turn_in_database(user_input, response, session_id=session.session_id)
+
+    total_ms = (time.perf_counter() - start) * 1000
+    ttft = f"{first_token_ms:.0f} ms" if first_token_ms is not None else "no tokens"
+    print(f"Time to first token: {ttft}, full answer: {total_ms:.0f} ms")
+    await send("done", {"response": response, "first_token_ms": first_token_ms, "total_ms": total_ms})
+    return stream
+
+#--------------------------------------------------
+# App
+#--------------------------------------------------
+
+def make_app(get_executor=get_agent_executor, sessions=None):
+    """
+    Build the aiohttp app. get_executor returns the agent to use for a turn,
+    so a fake agent (and a SessionManager with fake memories) can be plugged in to check the concurrency.
+    """
+    app = web.Application()
+    app["get_executor"] = get_executor
+    app["sessions"] = sessions or SessionManager(make_conversation_memory)
+    app.router.add_get("/", index)
+    app.router.add_post("/chat", chat)
+    app.router.add_post("/chat/stream", chat_stream)
+    return app
+
+#--------------------------------------------------
+# Run server
+#--------------------------------------------------
+
+# Not started by the menu bar app (its chat item is off); run this file to use it:
+#     python chatbox_ASYNC.py
+def run_async_server(port=5006):
+    webbrowser.open(f"http://127.0.0.1:{port}")
+    web.run_app(make_app(), host="127.0.0.1", port=port, print=None)
+
+
+if __name__ == "__main__":
+    try:
+        run_async_server()
+    except Exception as e:
+        print(f"Error starting the server:\n{str(e)}")
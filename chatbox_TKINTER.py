@@ -1,5 +1,4 @@
 import customtkinter as ctk
-from langchain.schema import AIMessage, HumanMessage
 from langchain_functions import *
 from tkinter import PhotoImage
 from dotenv import load_dotenv
@@ -44,8 +43,8 @@ class ChatboxApp(ctk.CTk):
         #--------------------------------------------------
         # Chain & chat history
         #--------------------------------------------------
-        self.chain = create_chain()
-        self.chat_history = load_chat_history_from_database()
+        self.chain = get_agent_executor()  # warm up the shared agent
+        self.chat_memory = get_conversation_memory()
 
         #--------------------------------------------------
         # Layout setup
@@ -125,11 +124,8 @@ class ChatboxApp(ctk.CTk):
 
         self.insert_message("You", user_input, align="right")
 
-        response = process_chat(self.chain, user_input, self.chat_history)
-        self.chat_history.append(HumanMessage(content=user_input))
-        self.chat_history.append(AIMessage(content=response))
-        save_message_in_database("human", user_input)
-        save_message_in_database("ai", response)
+        response = process_chat(get_agent_executor(), user_input, self.chat_memory.messages(user_input))
+        save_turn_in_database(user_input, response)
 
         self.insert_message("Majid", response, align="left")
         self.entry_box.delete("1.0", "end")
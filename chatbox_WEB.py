@@ -8,9 +8,11 @@ print("Frozen:", getattr(sys, "frozen", False))
 print('\n')
 
 from langchain_functions import *
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, Response, stream_with_context
+from chat_streaming import stream_chat, sse_format
+from chat_page import HTML
+from chat_sessions import SessionManager
 import webbrowser, subprocess
-from langchain.schema import AIMessage, HumanMessage
 import rumps
 import sys
 import importlib
@@ -27,160 +29,14 @@ print("\nDone\n")
 print("\nSetting up the APIs...\n")
 
 try:
-    chain = create_chain()
-    chat_history = load_chat_history_from_database()
+    chain = get_agent_executor()  # warm up the shared agent
 except Exception as e:
     rumps.alert("Error", f"Could not create the AI agent:\n {str(e)}")
 
-print("\nDone\n")
+# One conversation per browser session; idle ones are evicted from memory
+sessions = SessionManager(make_conversation_memory)
 
-#--------------------------------------------------
-# HTML template
-#--------------------------------------------------
-HTML = """
-<!DOCTYPE html>
-<html>
-<head>
-    <title>😼 Majid - Your Cat Assistant</title>
-    <style>
-        body {
-            font-family: Helvetica, sans-serif;
-            background-color: #2B2B2B;
-            color: white;
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            height: 100vh;
-            margin: 0;
-        }
-
-        .container {
-            width: 600px;
-            max-width: 90%;
-            background-color: #1E1E1E;
-            padding: 20px;
-            border-radius: 15px;
-            display: flex;
-            flex-direction: column;
-            height: 90vh;
-            box-sizing: border-box;
-        }
-
-        #chat_box {
-            flex: 1;
-            overflow-y: auto;
-            background-color: #2B2B2B;
-            padding: 10px;
-            border-radius: 10px;
-            margin-bottom: 10px;
-            word-wrap: break-word;
-            overflow-wrap: break-word;
-        }
-
-        .message {
-            margin: 5px 0;
-            padding: 8px 12px;
-            border-radius: 10px;
-            white-space: pre-wrap;
-            word-wrap: break-word;
-            overflow-wrap: break-word;
-        }
-
-        .user {
-            background-color: #444;
-            color: yellow;
-            text-align: right;
-        }
-
-        .ai {
-            background-color: #333;
-            color: white;
-            text-align: left;
-        }
-
-        #entry_box {
-            width: 100%;
-            height: 60px;
-            padding: 10px;
-            border-radius: 10px;
-            border: none;
-            resize: none;
-            background-color: #1E1E1E;
-            color: white;
-            box-sizing: border-box;
-            margin-bottom: 10px;
-            overflow-y: auto;
-        }
-
-        button {
-            padding: 10px 20px;
-            border: none;
-            border-radius: 10px;
-            background-color: #FFB347;
-            color: black;
-            font-weight: bold;
-            cursor: pointer;
-            align-self: flex-end;
-        }
-
-        button:hover {
-            background-color: #e6a03c;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h2>Chat with Majid</h2>
-        <div id="chat_box"></div>
-        <textarea id="entry_box" placeholder="Type a message..."></textarea>
-        <button onclick="sendMessage()">🐾 Send</button>
-    </div>
-
-    <script>
-        async function sendMessage() {
-            let text = document.getElementById("entry_box").value.trim();
-            if (!text) return;
-            appendMessage("user", text);
-            document.getElementById("entry_box").value = "";
-
-            const response = await fetch("/chat", {
-                method: "POST",
-                headers: { "Content-Type": "application/json" },
-                body: JSON.stringify({ message: text })
-            });
-
-            const data = await response.json();
-            appendMessage("ai", data.response);
-        }
-
-        function escapeHtml(unsafe) {
-            return unsafe
-                .replace(/&/g, "&amp;")
-                .replace(/</g, "&lt;")
-                .replace(/>/g, "&gt;")
-                .replace(/"/g, "&quot;")
-                .replace(/'/g, "&#039;");
-        }
-
-        function appendMessage(sender, text) {
-            const chatBox = document.getElementById("chat_box");
-            const div = document.createElement("div");
-            div.className = "message " + sender;
-            div.innerHTML = escapeHtml(text);
-            chatBox.appendChild(div);
-            chatBox.scrollTop = chatBox.scrollHeight;
-        }
-
-        document.getElementById("entry_box").addEventListener("keydown", function(event) {
-            if (event.key === "Enter" && !event.shiftKey) {
-                event.preventDefault();
-                sendMessage();
-            }
-        });
-    </script>
-</body>
-</html>
-"""
+print("\nDone\n")
 
 #--------------------------------------------------
 # Routes
@@ -196,18 +52,46 @@ def chat():
     print("\ndef chat\n")
     data = request.get_json()
     user_input = data.get("message", "").strip()
+    session_id = data.get("session_id") or DEFAULT_SESSION
     if not user_input:
-        return jsonify({"response": ""})
-
-    chat_history.append(HumanMessage(content=user_input))
-    save_message_in_database("human", user_input)
+        return jsonify({"response": "", "session_id": session_id})
 
-    response = process_chat(chain, user_input, chat_history)
-    chat_history.append(AIMessage(content=response))
-    save_message_in_database("ai", response)
+    # Flask answers on several threads; one turn at a time per session,
+    # so the history of the next turn includes this one
+    with sessions.use(session_id) as session, session.thread_lock:
+        # Recent turns verbatim plus a summary of the older ones
+        response = process_chat(get_agent_executor(), user_input, session.memory.messages(user_input))
+        save_turn_in_database(user_input, response, session_id=session_id)
 
     print("\nDone\n")
-    return jsonify({"response": response})
+    return jsonify({"response": response, "session_id": session_id})
+
+
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    """Same as /chat, but sends tokens and tool progress as Server-Sent Events."""
+    print("\ndef chat_stream\n")
+    data = request.get_json()
+    user_input = data.get("message", "").strip()
+    session_id = data.get("session_id") or DEFAULT_SESSION
+
+    def events():
+        if not user_input:
+            yield sse_format("done", {"response": ""})
+            return
+
+        with sessions.use(session_id) as session, session.thread_lock:
+            history = session.memory.messages(user_input)
+            for event, payload in stream_chat(get_agent_executor(), user_input, history):
+                if event == "done":
+                    save_turn_in_database(user_input, payload["response"], session_id=session_id)
+                yield sse_format(event, payload)
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 #--------------------------------------------------
@@ -0,0 +1,114 @@
+"""
+Token-budgeted conversation memory.
+
+Builds the messages that go into the chat_history placeholder of the agent prompt:
+the recent turns word for word, plus a running summary of everything older.
+The summary is kept in SQLite next to the history and only extended when the verbatim
+part grows past its token budget, so most turns do not call the LLM at all.
+With a ConversationRecall, the past exchanges most related to the new question are added too.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import threading
+from langchain_core.messages import SystemMessage, HumanMessage
+from chat_store import count_tokens
+
+SUMMARY_PROMPT = (
+    "Progressively summarize the conversation between a human and Majid, the AI cat assistant. "
+    "Extend the current summary with the new lines and return only the new summary. "
+    "Keep names, facts, decisions and open requests; drop small talk and jokes.\n\n"
+    "Current summary:\n{summary}\n\n"
+    "New lines of conversation:\n{lines}\n\n"
+    "New summary:"
+)
+
+#----------------------------------------------------------------------------
+# Summarizer
+#----------------------------------------------------------------------------
+
+def make_llm_summarizer(get_llm):
+    """
+    Summarizer that asks a chat model to fold new messages into the current summary.
+    get_llm() returns the model to use, so a shared client can be swapped when the keys change.
+    """
+
+    def summarize(summary, messages):
+        lines = "\n".join(
+            f"{'Human' if m.type == 'human' else 'Majid'}: {m.content}" for m in messages
+        )
+        prompt = SUMMARY_PROMPT.format(summary=summary or "(empty)", lines=lines)
+        return get_llm().invoke([HumanMessage(content=prompt)]).content.strip()
+
+    return summarize
+
+#----------------------------------------------------------------------------
+# Memory manager
+#----------------------------------------------------------------------------
+
+class ConversationMemory:
+    """
+    Prompt history for one conversation (session).
+    - max_tokens: the verbatim messages may grow up to this many tokens
+    - recent_tokens: once over max_tokens, older messages are summarized until only this many remain
+    - summary_input_tokens: most tokens of not yet summarized messages folded in one go.
+      On a long history that was never summarized, anything older than this is skipped.
+    """
+
+    def __init__(self, store, summarize, session_id="default", max_tokens=3000, recent_tokens=1500,
+                 summary_input_tokens=6000, recall=None, recall_k=3):
+        self.store = store
+        self.summarize = summarize
+        self.recall = recall
+        self.recall_k = recall_k
+        self.session_id = session_id
+        self.max_tokens = max_tokens
+        self.recent_tokens = recent_tokens
+        self.summary_input_tokens = summary_input_tokens
+        self.lock = threading.Lock()
+
+    def messages(self, query=None):
+        """Messages for the chat_history placeholder: [summary] + [related past turns] + recent turns."""
+        with self.lock:
+            upto_id, summary = self.store.load_summary(self.session_id)
+            buffer = self.store.load_recent(
+                max_tokens=self.max_tokens + self.summary_input_tokens,
+                after_id=upto_id,
+                session_id=self.session_id,
+            )
+            tokens = [count_tokens(m.content) for m in buffer]
+
+            if sum(tokens) > self.max_tokens:
+                # Keep the newest messages within recent_tokens, starting on a human turn
+                split = len(buffer)
+                used = 0
+                while split > 0 and used + tokens[split - 1] <= self.recent_tokens:
+                    split -= 1
+                    used += tokens[split]
+                while split < len(buffer) and buffer[split].type != "human":
+                    split += 1
+
+                older, buffer = buffer[:split], buffer[split:]
+                if older:
+                    summary = self.summarize(summary, older)
+                    upto_id = int(older[-1].id)
+                    self.store.save_summary(self.session_id, upto_id, summary)
+
+        context = []
+        if summary:
+            context.append(SystemMessage(content=f"Summary of the earlier conversation:\n{summary}"))
+
+        if self.recall is not None and query:
+            before_id = int(buffer[0].id) if buffer else None
+            related = self.recall.search(
+                query, k=self.recall_k, before_id=before_id, session_id=self.session_id
+            )
+            if related:
+                lines = "\n\n".join(
+                    f"Human: {human}" + (f"\nMajid: {ai}" if ai else "") for human, ai in related
+                )
+                context.append(SystemMessage(content=f"Related earlier exchanges:\n{lines}"))
+
+        return context + buffer
@@ -0,0 +1,144 @@
+"""
+Long-term memory over past conversations.
+
+Every stored turn (a human message and Majid's answer) is embedded into a vector table in
+chat_history.db, and the index is updated whenever new messages are saved. At each turn the
+few past exchanges most related to the new question are retrieved and put in the prompt next
+to the recent window, so the prompt stays about the same size however long the history is.
+
+Any LangChain Embeddings object can be used, e.g. DeterministicFakeEmbedding for offline checks.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import sqlite3
+import threading
+import numpy as np
+
+# Turns embedded per API call while catching up with the history
+_SYNC_BATCH = 64
+
+#----------------------------------------------------------------------------
+# Conversation recall
+#----------------------------------------------------------------------------
+
+class ConversationRecall:
+    """Vector index of past turns, kept in sync with a ChatHistoryStore."""
+
+    def __init__(self, store, embedding):
+        self.store = store
+        self.embedding = embedding
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(store.db_path, check_same_thread=False)
+
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS turn_vectors (
+                    human_id INTEGER PRIMARY KEY,
+                    ai_id INTEGER,
+                    vector BLOB NOT NULL,
+                    session_id TEXT NOT NULL DEFAULT 'default'
+                )
+            ''')
+            columns = [row[1] for row in self.conn.execute("PRAGMA table_info(turn_vectors)")]
+            if "session_id" not in columns:
+                self.conn.execute("ALTER TABLE turn_vectors ADD COLUMN session_id TEXT NOT NULL DEFAULT 'default'")
+
+        # Normalised vectors kept in memory for fast search, loaded on first use
+        self.ids = None
+        self.matrix = None
+
+        store.add_listener(lambda _: self.sync())
+
+    def _turn_text(self, human, ai):
+        return f"Human: {human}\nMajid: {ai}" if ai is not None else f"Human: {human}"
+
+    def _load_matrix(self):
+        rows = self.conn.execute(
+            "SELECT human_id, ai_id, session_id, vector FROM turn_vectors ORDER BY human_id"
+        ).fetchall()
+        self.ids = [(h, a, s) for h, a, s, _ in rows]
+        if rows:
+            self.matrix = np.vstack([np.frombuffer(v, dtype=np.float32) for _, _, _, v in rows])
+        else:
+            self.matrix = None
+
+    def _append(self, ids, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO turn_vectors (human_id, ai_id, session_id, vector) VALUES (?, ?, ?, ?)",
+                [(h, a, s, v.tobytes()) for (h, a, s), v in zip(ids, vectors)],
+            )
+        if self.ids is not None:
+            self.ids.extend(ids)
+            self.matrix = vectors if self.matrix is None else np.vstack([self.matrix, vectors])
+
+    def sync(self):
+        """Embed every complete turn saved since the last sync."""
+        with self.lock:
+            last = self.conn.execute(
+                "SELECT MAX(COALESCE(ai_id, human_id)) FROM turn_vectors"
+            ).fetchone()[0] or 0
+
+            while True:
+                start = last
+                rows = self.store.load_after(last, limit=2 * _SYNC_BATCH)
+                turns = []
+                i = 0
+                while i < len(rows):
+                    row_id, role, message, session_id = rows[i]
+                    if role != "human":
+                        last = row_id  # answer without a stored question
+                        i += 1
+                        continue
+                    if i + 1 < len(rows) and rows[i + 1][1] != "human" and rows[i + 1][3] == session_id:
+                        turns.append(((row_id, rows[i + 1][0], session_id), self._turn_text(message, rows[i + 1][2])))
+                        i += 2
+                    elif i + 1 < len(rows):
+                        turns.append(((row_id, None, session_id), self._turn_text(message, None)))
+                        i += 1
+                    else:
+                        break  # the answer of this question may not be saved yet
+
+                if turns:
+                    vectors = self.embedding.embed_documents([text for _, text in turns])
+                    self._append([ids for ids, _ in turns], vectors)
+                    last = max(last, max(a or h for (h, a, _), _ in turns))
+                if last == start or len(rows) < 2 * _SYNC_BATCH:
+                    return
+
+    def search(self, query, k=3, before_id=None, session_id="default"):
+        """
+        The k past turns of a session most similar to query, oldest first, as (human, ai) text pairs.
+        before_id leaves out turns from that message on, e.g. the recent window already in the prompt.
+        """
+        with self.lock:
+            if self.ids is None:
+                self._load_matrix()
+            if self.matrix is None:
+                return []
+            ids = list(self.ids)
+            matrix = self.matrix
+
+        q = np.asarray(self.embedding.embed_query(query), dtype=np.float32)
+        q /= max(np.linalg.norm(q), 1e-12)
+        scores = matrix @ q
+        excluded = [s != session_id or (before_id is not None and h >= before_id) for h, _, s in ids]
+        scores[np.array(excluded)] = -np.inf
+
+        top = [i for i in np.argsort(-scores)[:k] if np.isfinite(scores[i])]
+        wanted = sorted(ids[i][:2] for i in top)
+
+        results = []
+        with self.lock:
+            for human_id, ai_id in wanted:
+                rows = dict(self.conn.execute(
+                    "SELECT id, message FROM history WHERE id IN (?, ?)", (human_id, ai_id or -1)
+                ).fetchall())
+                if human_id in rows:
+                    results.append((rows[human_id], rows.get(ai_id)))
+        return results
@@ -0,0 +1,555 @@
+"""
+Background index of whole folders of documents.
+
+PDFs, text and markdown files under the folders added to the corpus are chunked, embedded
+and stored in a FAISS index on disk, split into shards of bounded size. A sync walks the
+folders, skips files whose size and mtime did not change, hashes the others, and only
+re-embeds files whose content really changed (removed files are dropped from their shard).
+Syncs run on a background thread, so questions about the corpus are answered from the
+index in milliseconds instead of reading documents on demand.
+
+Shards are written to a new folder and switched over in corpus.db in one transaction, so
+readers always see a complete shard, and a crash mid-sync leaves the previous state.
+Shards keep their flat FAISS index, which syncs edit; with index_type "ivfpq" or "hnsw",
+an approximate index built from it is saved next to it and used for searching.
+
+With store="mmap" the vectors go to one MmapVectorStore instead of FAISS shards: nothing
+is loaded into memory to search it, and chunks are appended as files are indexed instead of
+rewriting a shard at each checkpoint. Chunks are found by their file's path in the store,
+so ones appended by a sync that stopped half way are dropped when the file is indexed again.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import time
+import shutil
+import sqlite3
+import threading
+import faiss
+from langchain_core.documents import Document
+from langchain_community.vectorstores.faiss import FAISS
+from pdf_index_cache import file_sha256
+from pdf_ingest import iter_pages, iter_chunks, iter_windows, WINDOW_SIZE
+from embedding_store import model_name
+from mmap_vectors import MmapVectorStore
+from ann_index import INDEX_TYPES, MIN_VECTORS, TRAIN_SAMPLE, build_index, ivf_lists, refill, tune
+
+user_dir = os.path.expanduser("~/Library/Application Support/Majid")
+CORPUS_DIR = os.path.join(user_dir, "corpus_index")
+
+EXTENSIONS = (".pdf", ".txt", ".md", ".markdown")
+IGNORED_DIRS = frozenset({".git", "node_modules", "__pycache__", ".venv", ".Trash"})
+
+# Chunks per shard; a new shard is started once the last one is full (checked per window)
+SHARD_MAX_CHUNKS = 20000
+
+# Files indexed between two saves of the shards during a sync. Checkpoints only save the flat
+# shards; the approximate indexes are built once, when the sync finishes.
+CHECKPOINT_FILES = 20
+
+# Seconds between background syncs
+SYNC_INTERVAL = 600
+
+# "faiss" (sharded, loaded in memory) or "mmap" (memory-mapped file)
+STORE = "faiss"
+
+# Precision of the vectors in the mmap store; float16 halves the file
+MMAP_DTYPE = "float16"
+
+# The mmap store is compacted after a sync once this share of its rows is deleted
+COMPACT_RATIO = 0.3
+
+#----------------------------------------------------------------------------
+# Documents
+#----------------------------------------------------------------------------
+
+def iter_corpus_files(folders, extensions=EXTENSIONS, ignored=IGNORED_DIRS):
+    """Paths of the supported files under folders, without hidden and ignored folders."""
+    for folder in folders:
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = [d for d in dirs if d not in ignored and not d.startswith(".")]
+            for name in files:
+                if name.lower().endswith(extensions) and not name.startswith("."):
+                    yield os.path.join(root, name)
+
+
+def iter_file_documents(path):
+    """Pages of a PDF, or the whole text of a text or markdown file, as Documents."""
+    if path.lower().endswith(".pdf"):
+        yield from iter_pages(path)
+        return
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    yield Document(page_content=text, metadata={"source": path, "file_path": path})
+
+#----------------------------------------------------------------------------
+# Corpus index
+#----------------------------------------------------------------------------
+
+class CorpusIndex:
+    """
+    Vector index of the documents in a set of folders, in FAISS shards or an mmap store.
+    scheduler is an EmbeddingScheduler (its embedding is also used for queries).
+    """
+
+    def __init__(self, scheduler, splitter, index_dir=CORPUS_DIR, shard_max_chunks=SHARD_MAX_CHUNKS,
+                 store=STORE, mmap_dtype=MMAP_DTYPE, index_type="flat"):
+        if store not in ("faiss", "mmap"):
+            raise ValueError(f"Unknown store: {store}")
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type: {index_type}")
+        self.store = store
+        self.index_type = index_type
+        self.mmap_dtype = mmap_dtype
+        self.scheduler = scheduler
+        self.embedding = scheduler.embedding
+        self.splitter = splitter
+        self.index_dir = index_dir
+        self.shard_max_chunks = shard_max_chunks
+        os.makedirs(os.path.join(self.index_dir, "shards"), exist_ok=True)
+
+        self.lock = threading.Lock()        # corpus.db and the loaded shards
+        self.sync_lock = threading.Lock()   # one sync at a time
+        self.conn = sqlite3.connect(os.path.join(self.index_dir, "corpus.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+
+        with self.lock, self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS folders (path TEXT PRIMARY KEY)")
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS files (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    chunks INTEGER NOT NULL
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS shards (
+                    id INTEGER PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    chunks INTEGER NOT NULL
+                )
+            ''')
+            # Which shard holds each chunk, to delete the chunks of a changed file
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS chunks (
+                    doc_id TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    shard INTEGER NOT NULL
+                )
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_path ON chunks (path)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+        # Shards loaded for searching: {shard id: (version, FAISS)}
+        self.loaded = {}
+        self.vectors = self._open_vectors() if store == "mmap" else None
+        self.thread = None
+        self.wake = threading.Event()
+        self.stopping = threading.Event()
+        self.last_sync = None
+
+    #********** Folders **********
+
+    def add_folder(self, path):
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR IGNORE INTO folders (path) VALUES (?)", (os.path.abspath(path),))
+
+    def remove_folder(self, path):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM folders WHERE path = ?", (os.path.abspath(path),))
+
+    def folders(self):
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT path FROM folders ORDER BY path")]
+
+    def stats(self):
+        with self.lock:
+            files, chunks = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(chunks), 0) FROM files").fetchone()
+            shards = self.conn.execute("SELECT COUNT(*) FROM shards").fetchone()[0]
+        return {"files": files, "chunks": chunks, "shards": shards, "store": self.store, "last_sync": self.last_sync}
+
+    #********** Shards on disk **********
+
+    def _shard_dir(self, shard_id, version):
+        return os.path.join(self.index_dir, "shards", f"{shard_id:05d}-v{version}")
+
+    def _load_shard(self, shard_id, version):
+        return FAISS.load_local(
+            self._shard_dir(shard_id, version), self.embedding, allow_dangerous_deserialization=True
+        )
+
+    def _ann_path(self, shard_id, version):
+        return os.path.join(self._shard_dir(shard_id, version), f"{self.index_type}.faiss")
+
+    def _needs_ann(self, shard_id, version, chunks):
+        return (self.index_type != "flat" and version > 0 and chunks >= MIN_VECTORS
+                and not os.path.exists(self._ann_path(shard_id, version)))
+
+    def _trained_ann(self, shard_id, version):
+        # The IVF-PQ index of a shard version emptied of its vectors, to reuse its training
+        path = self._ann_path(shard_id, version) if version else None
+        if self.index_type != "ivfpq" or path is None or not os.path.exists(path):
+            return None
+        index = faiss.read_index(path)
+        index.reset()
+        return index
+
+    def _save_ann(self, shard_id, version, vs, trained=None):
+        # Approximate index for searching, with the positions of the flat one
+        index = vs.index
+        if self.index_type == "flat" or index.ntotal < MIN_VECTORS:
+            return
+        vectors = index.reconstruct_n(0, index.ntotal)
+        # Training is reused until the shard has grown enough to want twice as many clusters
+        if trained is not None and ivf_lists(min(index.ntotal, TRAIN_SAMPLE)) < 2 * trained.nlist:
+            faiss.write_index(refill(trained, vectors), self._ann_path(shard_id, version))
+            return
+        ann = build_index(self.index_type, vectors, metric=index.metric_type)
+        faiss.write_index(ann, self._ann_path(shard_id, version))
+
+    def _load_search_shard(self, shard_id, version):
+        vs = self._load_shard(shard_id, version)
+        path = self._ann_path(shard_id, version)
+        if self.index_type != "flat" and os.path.exists(path):
+            vs.index = tune(faiss.read_index(path))
+        return vs
+
+    def _open_vectors(self):
+        return MmapVectorStore(os.path.join(self.index_dir, "vectors"), dtype=self.mmap_dtype)
+
+    #********** Syncing **********
+
+    def sync(self):
+        """
+        Bring the index up to date with the folders.
+        Returns (files indexed, files removed).
+        """
+        with self.sync_lock:
+            start = time.perf_counter()
+            self._check_model()
+            with self.lock:
+                known = {
+                    path: (mtime, size, sha)
+                    for path, mtime, size, sha in self.conn.execute("SELECT path, mtime, size, sha256 FROM files")
+                }
+                shards = {sid: [version, chunks] for sid, version, chunks in self.conn.execute(
+                    "SELECT id, version, chunks FROM shards"
+                )}
+                folders = [row[0] for row in self.conn.execute("SELECT path FROM folders")]
+
+            work = SyncWork(self, shards)
+            with self.lock:
+                row = self.conn.execute("SELECT value FROM meta WHERE key = 'index_type'").fetchone()
+            if (row[0] if row else "flat") != self.index_type:
+                work.rewrite_all()  # builds the indexes of the new type
+            seen = set()
+            for path in iter_corpus_files(folders):
+                seen.add(path)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                old = known.get(path)
+                if old and old[0] == st.st_mtime and old[1] == st.st_size:
+                    continue
+                sha = file_sha256(path)
+                if old and old[2] == sha:
+                    work.touch(path, st.st_mtime, st.st_size)  # touched but not changed
+                    continue
+                try:
+                    work.index(path, st.st_mtime, st.st_size, sha)
+                except Exception as e:
+                    print(f"Corpus: could not index {path}: {e}")
+                if work.indexed % CHECKPOINT_FILES == 0 and work.dirty:
+                    work.commit()
+
+            for path in known:
+                if path not in seen:
+                    work.remove(path)
+            work.commit(final=True)
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('index_type', ?)", (self.index_type,)
+                )
+
+            vectors = self.vectors
+            if vectors is not None and vectors.deleted and len(vectors.deleted) > COMPACT_RATIO * vectors.count:
+                vectors.compact()
+
+            self.last_sync = time.time()
+            print(f"Corpus sync: {work.indexed} files indexed, {work.removed} removed "
+                  f"in {time.perf_counter() - start:.1f}s")
+            return work.indexed, work.removed
+
+    def _check_model(self):
+        # Vectors of another embedding model (or kept in the other store) cannot be mixed in: start again
+        model = model_name(self.embedding)
+        with self.lock:
+            meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+            if meta.get("model") == model and meta.get("store", "faiss") == self.store:
+                return
+            if meta:
+                print(f"Corpus: embedding model or store changed to {model} ({self.store}), indexing again")
+            with self.conn:
+                self.conn.execute("DELETE FROM files")
+                self.conn.execute("DELETE FROM chunks")
+                self.conn.execute("DELETE FROM shards")
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [("model", model), ("store", self.store)],
+                )
+            self.loaded = {}
+            if self.vectors is not None:
+                self.vectors.close()
+        shutil.rmtree(os.path.join(self.index_dir, "shards"), ignore_errors=True)
+        shutil.rmtree(os.path.join(self.index_dir, "vectors"), ignore_errors=True)
+        os.makedirs(os.path.join(self.index_dir, "shards"), exist_ok=True)
+        if self.vectors is not None:
+            self.vectors = self._open_vectors()
+
+    #********** Background **********
+
+    def start(self, interval=SYNC_INTERVAL):
+        """Sync now and then every interval seconds on a background thread."""
+        if self.thread is not None:
+            self.wake.set()
+            return
+
+        def loop():
+            while not self.stopping.is_set():
+                try:
+                    self.sync()
+                except Exception as e:
+                    print(f"Corpus sync failed: {e}")
+                self.wake.wait(interval)
+                self.wake.clear()
+
+        self.thread = threading.Thread(target=loop, name="corpus-sync", daemon=True)
+        self.thread.start()
+
+    def request_sync(self):
+        """Run the background sync as soon as possible."""
+        if self.thread is None:
+            self.start()
+        else:
+            self.wake.set()
+
+    def stop(self):
+        self.stopping.set()
+        self.wake.set()
+
+    #********** Searching **********
+
+    def _current_shards(self):
+        # Load shards that are new or were rewritten since they were last loaded
+        with self.lock:
+            versions = dict(self.conn.execute("SELECT id, version FROM shards"))
+            for shard_id in list(self.loaded):
+                if shard_id not in versions:
+                    del self.loaded[shard_id]
+            for shard_id, version in versions.items():
+                loaded = self.loaded.get(shard_id)
+                if loaded is None or loaded[0] != version:
+                    self.loaded[shard_id] = (version, self._load_search_shard(shard_id, version))
+            return [vs for _, vs in self.loaded.values()]
+
+    def search(self, query, k=5):
+        """The k chunks closest to query over every shard, as (Document, distance), best first."""
+        if self.vectors is not None:
+            hits = self.vectors.search(self.embedding.embed_query(query), k=k)
+            return [(Document(page_content=text, metadata=metadata), 1.0 - score)
+                    for _, text, metadata, score in hits]
+
+        shards = self._current_shards()
+        if not shards:
+            return []
+        vector = self.embedding.embed_query(query)
+        hits = []
+        for vs in shards:
+            hits.extend(vs.similarity_search_with_score_by_vector(vector, k=k))
+        hits.sort(key=lambda hit: hit[1])
+        return [(doc, float(score)) for doc, score in hits[:k]]
+
+    def close(self):
+        self.stop()
+        with self.lock:
+            self.conn.close()
+            if self.vectors is not None:
+                self.vectors.close()
+
+
+class SyncWork:
+    """Changes of one sync, applied to working copies of the shards and saved in checkpoints."""
+
+    def __init__(self, corpus, shards):
+        self.corpus = corpus
+        self.shards = shards          # {shard id: [version, chunks]}
+        self.open = {}                # {shard id: FAISS} loaded during this sync
+        self.modified = set()         # shards changed since the last commit
+        # Shards saved without their approximate index (at a checkpoint, or by a sync that
+        # stopped before the end); it is built by the final commit
+        self.ann_pending = {sid for sid, (version, chunks) in shards.items()
+                            if corpus._needs_ann(sid, version, chunks)}
+        self.trained = {}             # {shard id: emptied IVF-PQ index} of versions removed by checkpoints
+        self.file_rows = []           # rows to write in files
+        self.deleted_files = []
+        self.chunk_rows = []          # (doc_id, path, shard) added
+        self.deleted_chunks = []      # doc_ids removed
+        self.indexed = 0
+        self.removed = 0
+
+    @property
+    def dirty(self):
+        return bool(self.modified or self.file_rows or self.deleted_files)
+
+    def _shard(self, shard_id):
+        if shard_id not in self.open:
+            version = self.shards[shard_id][0]
+            self.open[shard_id] = self.corpus._load_shard(shard_id, version)
+        return self.open[shard_id]
+
+    def _drop_chunks(self, path):
+        if self.corpus.vectors is not None:
+            self.corpus.vectors.delete_source(path)
+            return
+        with self.corpus.lock:
+            rows = self.corpus.conn.execute("SELECT doc_id, shard FROM chunks WHERE path = ?", (path,)).fetchall()
+        by_shard = {}
+        for doc_id, shard_id in rows:
+            by_shard.setdefault(shard_id, []).append(doc_id)
+        for shard_id, doc_ids in by_shard.items():
+            if shard_id in self.shards:
+                self._shard(shard_id).delete(doc_ids)
+                self.shards[shard_id][1] -= len(doc_ids)
+                self.modified.add(shard_id)
+        self.deleted_chunks.extend(doc_id for doc_id, _ in rows)
+
+    def _target_shard(self):
+        # The last shard while it has room, otherwise a new one
+        if self.shards:
+            last = max(self.shards)
+            if self.shards[last][1] < self.corpus.shard_max_chunks:
+                return last
+            return last + 1
+        return 1
+
+    def index(self, path, mtime, size, sha):
+        # Also drops chunks left by an earlier sync that stopped half way through this file
+        self._drop_chunks(path)
+        if self.corpus.vectors is not None:
+            self._append(path, mtime, size, sha)
+            return
+
+        added = []  # (shard id, doc ids) of this file, taken back if it fails half way
+        try:
+            chunks = iter_chunks(iter_file_documents(path), self.corpus.splitter)
+            for window in iter_windows(chunks, WINDOW_SIZE):
+                shard_id = self._target_shard()
+                if shard_id not in self.shards:
+                    self.shards[shard_id] = [0, 0]
+                    vs = None
+                else:
+                    vs = self._shard(shard_id)
+                before = len(vs.index_to_docstore_id) if vs is not None else 0
+                vs = self.corpus.scheduler.build_faiss(window, vectorstore=vs)
+                self.open[shard_id] = vs
+                self.modified.add(shard_id)
+                new_ids = [vs.index_to_docstore_id[i] for i in range(before, len(vs.index_to_docstore_id))]
+                added.append((shard_id, new_ids))
+                self.shards[shard_id][1] += len(new_ids)
+        except Exception:
+            for shard_id, doc_ids in added:
+                self.open[shard_id].delete(doc_ids)
+                self.shards[shard_id][1] -= len(doc_ids)
+            raise
+
+        for shard_id, doc_ids in added:
+            self.chunk_rows.extend((doc_id, path, shard_id) for doc_id in doc_ids)
+        self.file_rows.append((path, mtime, size, sha, sum(len(ids) for _, ids in added)))
+        self.indexed += 1
+
+    def _append(self, path, mtime, size, sha):
+        # mmap store: batches are appended as they are embedded, under the file's path
+        vectors = self.corpus.vectors
+        added = 0
+        try:
+            chunks = iter_chunks(iter_file_documents(path), self.corpus.splitter)
+            for window in iter_windows(chunks, WINDOW_SIZE):
+                texts = [doc.page_content for doc in window]
+                for indices, batch in self.corpus.scheduler.iter_embeddings(texts):
+                    added += len(vectors.append(
+                        batch, [texts[i] for i in indices], [window[i].metadata for i in indices], source=path
+                    ))
+        except Exception:
+            vectors.delete_source(path)
+            raise
+
+        self.file_rows.append((path, mtime, size, sha, added))
+        self.indexed += 1
+
+    def rewrite_all(self):
+        for shard_id in self.shards:
+            self._shard(shard_id)
+            self.modified.add(shard_id)
+
+    def touch(self, path, mtime, size):
+        with self.corpus.lock, self.corpus.conn:
+            self.corpus.conn.execute("UPDATE files SET mtime = ?, size = ? WHERE path = ?", (mtime, size, path))
+
+    def remove(self, path):
+        self._drop_chunks(path)
+        self.deleted_files.append(path)
+        self.removed += 1
+
+    def commit(self, final=False):
+        """
+        Save the modified shards as new versions and record everything in one transaction.
+        Only the final commit of a sync builds the approximate indexes: training IVF-PQ at
+        every checkpoint would take most of a large first sync.
+        """
+        corpus = self.corpus
+        if final:
+            self.modified |= self.ann_pending
+        old_dirs = []
+        for shard_id in sorted(self.modified):
+            vs = self._shard(shard_id)
+            previous = self.shards[shard_id][0]
+            version = previous + 1
+            vs.save_local(corpus._shard_dir(shard_id, version))
+            trained = self.trained.pop(shard_id, None) or corpus._trained_ann(shard_id, previous)
+            if final:
+                corpus._save_ann(shard_id, version, vs, trained)
+            else:
+                self.ann_pending.add(shard_id)
+                if trained is not None:
+                    self.trained[shard_id] = trained  # the old version's file is removed below
+            if previous > 0:
+                old_dirs.append(corpus._shard_dir(shard_id, previous))
+            self.shards[shard_id][0] = version
+        if final:
+            self.ann_pending = set()
+
+        with corpus.lock, corpus.conn:
+            for shard_id in self.modified:
+                version, chunks = self.shards[shard_id]
+                corpus.conn.execute(
+                    "INSERT OR REPLACE INTO shards (id, version, chunks) VALUES (?, ?, ?)", (shard_id, version, chunks)
+                )
+            corpus.conn.executemany("DELETE FROM chunks WHERE doc_id = ?", [(d,) for d in self.deleted_chunks])
+            corpus.conn.executemany("INSERT INTO chunks (doc_id, path, shard) VALUES (?, ?, ?)", self.chunk_rows)
+            corpus.conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in self.deleted_files])
+            corpus.conn.executemany(
+                "INSERT OR REPLACE INTO files (path, mtime, size, sha256, chunks) VALUES (?, ?, ?, ?, ?)",
+                self.file_rows,
+            )
+
+        for path in old_dirs:
+            shutil.rmtree(path, ignore_errors=True)
+        self.modified = set()
+        self.file_rows, self.deleted_files = [], []
+        self.chunk_rows, self.deleted_chunks = [], []
@@ -0,0 +1,158 @@
+"""
+Directory listings for the file tools.
+
+Folders are read with os.scandir, whose entries already know whether they are folders, so
+listing costs one system call per directory instead of one stat per item. Size and
+modification time are only read (one stat per item) when they are asked for.
+
+Listings are sorted, split into pages and capped in characters, so a folder with thousands
+of items does not end up in the prompt whole. Recent listings are kept for a few seconds and
+reused as long as the folder's modification time has not changed.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import time
+import datetime
+import threading
+from collections import OrderedDict
+
+# Seconds a listing is reused without checking the folder again
+CACHE_TTL = 10
+CACHE_DIRS = 128
+
+PAGE_SIZE = 100
+MAX_CHARS = 6000
+
+SORT_KEYS = ("name", "mtime", "size")
+
+#----------------------------------------------------------------------------
+# Reading folders
+#----------------------------------------------------------------------------
+
+class Entry:
+    __slots__ = ("name", "is_dir", "size", "mtime")
+
+    def __init__(self, name, is_dir, size=None, mtime=None):
+        self.name = name
+        self.is_dir = is_dir
+        self.size = size
+        self.mtime = mtime
+
+
+def scan_directory(path, with_stat=False):
+    """Entries of a folder; size and mtime are only filled in with with_stat."""
+    entries = []
+    with os.scandir(path) as it:
+        for item in it:
+            try:
+                is_dir = item.is_dir()
+            except OSError:
+                is_dir = False
+            entry = Entry(item.name, is_dir)
+            if with_stat:
+                try:
+                    st = item.stat()
+                    entry.size = None if is_dir else st.st_size
+                    entry.mtime = st.st_mtime
+                except OSError:
+                    pass
+            entries.append(entry)
+    return entries
+
+
+class DirectoryCache:
+    """Short-lived listings by folder, dropped as soon as the folder's mtime changes."""
+
+    def __init__(self, ttl=CACHE_TTL, max_dirs=CACHE_DIRS):
+        self.ttl = ttl
+        self.max_dirs = max_dirs
+        self.lock = threading.Lock()
+        self.listings = OrderedDict()  # (path, with_stat) -> (dir mtime, read at, entries)
+
+    def entries(self, path, with_stat=False):
+        key = (os.path.abspath(path), with_stat)
+        dir_mtime = os.stat(path).st_mtime
+        now = time.monotonic()
+
+        with self.lock:
+            cached = self.listings.get(key)
+            if cached and cached[0] == dir_mtime and now - cached[1] < self.ttl:
+                self.listings.move_to_end(key)
+                return cached[2]
+
+        entries = scan_directory(path, with_stat)
+        with self.lock:
+            self.listings[key] = (dir_mtime, now, entries)
+            self.listings.move_to_end(key)
+            while len(self.listings) > self.max_dirs:
+                self.listings.popitem(last=False)
+        return entries
+
+#----------------------------------------------------------------------------
+# Pages
+#----------------------------------------------------------------------------
+
+def sort_entries(entries, sort_by="name"):
+    """Folders first by name; or newest / largest first."""
+    if sort_by == "mtime":
+        return sorted(entries, key=lambda e: (-(e.mtime or 0), e.name.lower()))
+    if sort_by == "size":
+        return sorted(entries, key=lambda e: (-(e.size or 0), e.name.lower()))
+    return sorted(entries, key=lambda e: (not e.is_dir, e.name.lower()))
+
+
+def _human_size(size):
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_entry(entry, details=False):
+    line = f"[Folder] {entry.name}" if entry.is_dir else f"[File]   {entry.name}"
+    if details:
+        extra = []
+        if entry.size is not None:
+            extra.append(_human_size(entry.size))
+        if entry.mtime is not None:
+            extra.append(datetime.datetime.fromtimestamp(entry.mtime).strftime("%Y-%m-%d %H:%M"))
+        if extra:
+            line += "  (" + ", ".join(extra) + ")"
+    return line
+
+
+def paginate(lines, page_size=PAGE_SIZE, max_chars=MAX_CHARS):
+    """
+    Split lines into pages of at most page_size lines and max_chars characters
+    (a page always has at least one line). Returns (start, end) of every page.
+    """
+    pages = []
+    start = used = 0
+    for i, line in enumerate(lines):
+        if i > start and (i - start >= page_size or used + len(line) + 1 > max_chars):
+            pages.append((start, i))
+            start, used = i, 0
+        used += len(line) + 1
+    pages.append((start, len(lines)))
+    return pages
+
+
+def render_page(path, entries, page=1, page_size=PAGE_SIZE, sort_by="name", details=False,
+                max_chars=MAX_CHARS, formatter=format_entry):
+    """
+    One page of a listing as text, with a header saying where it is in the folder.
+    Pages end at page_size items or max_chars characters, and each starts where the last one ended.
+    """
+    lines = [formatter(entry, details) for entry in sort_entries(entries, sort_by)]
+    pages = paginate(lines, page_size, max_chars)
+    page = min(max(1, page), len(pages))
+    first, end = pages[page - 1]
+
+    total = len(lines)
+    header = f"Contents of {path} (items {min(first + 1, total)}-{end} of {total}, page {page} of {len(pages)}):"
+    footer = [f"(More items: ask for page {page + 1}.)"] if page < len(pages) else []
+    return "\n".join([header] + lines[first:end] + footer)
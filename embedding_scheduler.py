@@ -0,0 +1,146 @@
+"""
+Batched, concurrent embedding of document chunks.
+
+Chunks are grouped into batches by token count (tiktoken), the batches are sent to the
+embedding model from a bounded thread pool, rate-limit (429) errors are retried with
+exponential backoff, and finished vectors are added to the FAISS index as soon as each
+batch comes back.
+
+Any LangChain Embeddings object can be scheduled, so the scheduler can be exercised with
+langchain_core.embeddings.DeterministicFakeEmbedding instead of the OpenAI API.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import time
+import random
+import tiktoken
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from langchain_community.vectorstores.faiss import FAISS
+
+#----------------------------------------------------------------------------
+# Rate-limit helpers
+#----------------------------------------------------------------------------
+
+def is_rate_limit_error(error):
+    """True for HTTP 429 errors, from the OpenAI client or any HTTP client."""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+
+def retry_after_seconds(error):
+    """Delay asked for by the server in the Retry-After header, if any."""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+#----------------------------------------------------------------------------
+# Scheduler
+#----------------------------------------------------------------------------
+
+class EmbeddingScheduler:
+    """
+    Embeds many texts with a bounded pool of workers.
+    - max_batch_tokens: token budget of one request
+    - max_batch_size: number of texts in one request
+    - max_workers: number of requests in flight
+    - max_retries: retries of a batch after a 429 before giving up
+    """
+
+    def __init__(self, embedding, max_batch_tokens=20000, max_batch_size=256, max_workers=4,
+                 max_retries=6, base_delay=1.0, max_delay=30.0, encoding_name="cl100k_base"):
+        self.embedding = embedding
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_size = max_batch_size
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.encoding = tiktoken.get_encoding(encoding_name)
+
+    def make_batches(self, texts):
+        """Split texts into lists of indices that fit the token and size budgets."""
+        batches = []
+        current = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            n_tokens = len(self.encoding.encode(text, disallowed_special=()))
+            if current and (current_tokens + n_tokens > self.max_batch_tokens
+                            or len(current) >= self.max_batch_size):
+                batches.append(current)
+                current = []
+                current_tokens = 0
+            current.append(i)
+            current_tokens += n_tokens
+        if current:
+            batches.append(current)
+        return batches
+
+    def _embed_batch(self, texts):
+        attempt = 0
+        while True:
+            try:
+                return self.embedding.embed_documents(texts)
+            except Exception as e:
+                if not is_rate_limit_error(e) or attempt >= self.max_retries:
+                    raise
+                delay = retry_after_seconds(e)
+                if delay is None:
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                    delay *= random.uniform(0.5, 1.0)  # jitter so workers do not retry together
+                attempt += 1
+                print(f"Embedding rate limited, retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+    def iter_embeddings(self, texts):
+        """
+        Yield (indices, vectors) for each batch as soon as it is embedded.
+        Batches finish in any order; indices point back into texts.
+        """
+        batches = self.make_batches(texts)
+        if not batches:
+            return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {}
+            next_batch = 0
+            try:
+                while next_batch < len(batches) or pending:
+                    # Keep only a couple of batches queued per worker
+                    while next_batch < len(batches) and len(pending) < 2 * self.max_workers:
+                        indices = batches[next_batch]
+                        future = pool.submit(self._embed_batch, [texts[i] for i in indices])
+                        pending[future] = indices
+                        next_batch += 1
+
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        indices = pending.pop(future)
+                        yield indices, future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def build_faiss(self, documents, vectorstore=None):
+        """
+        Build a FAISS index from documents, adding each batch as it arrives.
+        Pass an existing vectorstore to append the documents to it instead.
+        """
+        texts = [doc.page_content for doc in documents]
+        for indices, vectors in self.iter_embeddings(texts):
+            text_embeddings = [(texts[i], v) for i, v in zip(indices, vectors)]
+            metadatas = [documents[i].metadata for i in indices]
+            if vectorstore is None:
+                vectorstore = FAISS.from_embeddings(text_embeddings, self.embedding, metadatas=metadatas)
+            else:
+                vectorstore.add_embeddings(text_embeddings, metadatas=metadatas)
+
+        if vectorstore is None:
+            raise ValueError("No text to embed")
+        return vectorstore
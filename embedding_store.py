@@ -0,0 +1,144 @@
+"""
+Content-addressed store of embedding vectors.
+
+Vectors are saved in SQLite next to chat_history.db, keyed by a hash of the chunk text and
+the embedding model name. When a PDF gets a small edit, only the chunks whose text changed
+are sent to the embedding API again; every other chunk is read back from the store.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+#----------------------------------------------------------------------------
+# Store location
+#----------------------------------------------------------------------------
+
+user_dir = os.path.expanduser("~/Library/Application Support/Majid")
+STORE_PATH = os.path.join(user_dir, "embeddings.db")
+
+# SQLite limits the number of "?" in one statement
+_LOOKUP_BATCH = 500
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def model_name(embedding):
+    """Name used to keep vectors of different embedding models apart."""
+    return getattr(embedding, "model", None) or type(embedding).__name__
+
+#----------------------------------------------------------------------------
+# Vector store
+#----------------------------------------------------------------------------
+
+class EmbeddingStore:
+    """SQLite table of float32 vectors keyed by (text hash, model)."""
+
+    def __init__(self, db_path=STORE_PATH):
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS vectors (
+                    text_hash TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    dim INTEGER NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (text_hash, model)
+                )
+            ''')
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def get_many(self, hashes, model):
+        """Return {text_hash: vector} for the hashes that are already stored."""
+        hashes = list(dict.fromkeys(hashes))
+        found = {}
+        with self._connect() as conn:
+            for start in range(0, len(hashes), _LOOKUP_BATCH):
+                batch = hashes[start:start + _LOOKUP_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM vectors WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *batch],
+                ).fetchall()
+                for h, blob in rows:
+                    found[h] = np.frombuffer(blob, dtype=np.float32).tolist()
+        return found
+
+    def put_many(self, items, model):
+        """Save an iterable of (text_hash, vector) pairs."""
+        rows = []
+        for h, vector in items:
+            arr = np.asarray(vector, dtype=np.float32)
+            rows.append((h, model, arr.shape[0], arr.tobytes()))
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO vectors (text_hash, model, dim, vector) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+#----------------------------------------------------------------------------
+# Embeddings wrapper
+#----------------------------------------------------------------------------
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model so that documents are only embedded once.
+    Unseen texts go to the wrapped model; the rest come from the store.
+    hits and misses count the texts served from the store and from the model.
+    """
+
+    def __init__(self, embedding, store=None):
+        self.embedding = embedding
+        self.store = store or EmbeddingStore()
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    @property
+    def model(self):
+        # Asked each time: the wrapped model may only be built (with the API keys) later
+        return model_name(self.embedding)
+
+    def embed_documents(self, texts):
+        hashes = [text_hash(t) for t in texts]
+        model = self.model
+        vectors = self.store.get_many(hashes, model)
+
+        # Embed every unseen text once, even if it appears in several chunks
+        missing = {}
+        for h, t in zip(hashes, texts):
+            if h not in vectors and h not in missing:
+                missing[h] = t
+
+        if missing:
+            new_vectors = self.embedding.embed_documents(list(missing.values()))
+            new_items = list(zip(missing.keys(), new_vectors))
+            self.store.put_many(new_items, model)
+            vectors.update(new_items)
+
+        with self.lock:
+            self.misses += len(missing)
+            self.hits += len(texts) - len(missing)
+
+        return [vectors[h] for h in hashes]
+
+    def embed_query(self, text):
+        return self.embedding.embed_query(text)
+
+    def reset_stats(self):
+        with self.lock:
+            self.hits = 0
+            self.misses = 0
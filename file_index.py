@@ -0,0 +1,284 @@
+"""
+Local index of file and folder names.
+
+Names and paths under a root folder are kept in file_index.db with a trigram FTS5 index
+over the names. The index is built by a crawler that runs os.scandir on many directories
+at once, and refreshed incrementally: every directory is stat'ed, but only those whose
+modification time changed are listed again (a directory's mtime changes when entries are
+added, removed or renamed in it). Folders like .git and node_modules are never entered.
+
+Names can be looked up exactly, by prefix, or fuzzily (trigrams, tolerant of typos), always
+with a result limit.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import time
+import difflib
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+user_dir = os.path.expanduser("~/Library/Application Support/Majid")
+INDEX_PATH = os.path.join(user_dir, "file_index.db")
+
+IGNORED_DIRS = frozenset({
+    ".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", ".tox", ".cache", ".Trash",
+})
+
+# Seconds during which an indexed root is not refreshed again
+REFRESH_INTERVAL = 300
+
+# Directories listed at the same time while crawling
+CRAWL_WORKERS = 8
+
+# Fuzzy matches less similar than this to the query are left out
+MIN_SIMILARITY = 0.5
+
+# Directories written to the database per transaction
+_COMMIT_EVERY = 500
+
+#----------------------------------------------------------------------------
+# Crawling
+#----------------------------------------------------------------------------
+
+def _scan(path, known_mtime):
+    """(mtime, [(name, is_dir)]) of a directory; the entries are None if its mtime is unchanged."""
+    try:
+        mtime = os.stat(path).st_mtime
+    except OSError:
+        return None, None
+    if mtime == known_mtime:
+        return mtime, None
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    is_dir = False
+                entries.append((entry.name, is_dir))
+    except OSError:
+        return None, None
+    return mtime, entries
+
+
+def _subtree(path):
+    # SQL range covering everything below path ('0' sorts right after '/')
+    prefix = path.rstrip(os.sep) + os.sep
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+#----------------------------------------------------------------------------
+# Index
+#----------------------------------------------------------------------------
+
+class FileIndex:
+    """Names of files and folders under one or more roots."""
+
+    def __init__(self, db_path=INDEX_PATH, ignored=IGNORED_DIRS, workers=CRAWL_WORKERS,
+                 refresh_interval=REFRESH_INTERVAL):
+        self.db_path = db_path
+        self.ignored = frozenset(ignored)
+        self.workers = workers
+        self.refresh_interval = refresh_interval
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    id INTEGER PRIMARY KEY,
+                    path TEXT UNIQUE NOT NULL,
+                    parent TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    name_lower TEXT NOT NULL,
+                    is_dir INTEGER NOT NULL
+                )
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_parent ON entries (parent)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_name ON entries (name_lower)")
+            self.conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS names_fts USING fts5 (
+                    name_lower, content = 'entries', content_rowid = 'id', tokenize = 'trigram'
+                )
+            ''')
+            # Keep the trigram index in step with the entries table
+            self.conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+                    INSERT INTO names_fts (rowid, name_lower) VALUES (new.id, new.name_lower);
+                END
+            ''')
+            self.conn.execute('''
+                CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+                    INSERT INTO names_fts (names_fts, rowid, name_lower) VALUES ('delete', old.id, old.name_lower);
+                END
+            ''')
+            # mtime of every listed directory, to know which ones changed
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS dirs (
+                    path TEXT PRIMARY KEY,
+                    mtime REAL NOT NULL
+                )
+            ''')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS roots (
+                    path TEXT PRIMARY KEY,
+                    refreshed REAL NOT NULL
+                )
+            ''')
+
+    #********** Building **********
+
+    def _indexed_root(self, path):
+        # The indexed root that contains path, if any
+        for (root,) in self.conn.execute("SELECT path FROM roots"):
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                return root
+        return None
+
+    def _forget(self, path):
+        # Drop a directory and everything below it
+        low, high = _subtree(path)
+        self.conn.execute("DELETE FROM entries WHERE path >= ? AND path < ?", (low, high))
+        self.conn.execute("DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (path, low, high))
+
+    def _store(self, path, mtime, entries):
+        # Replace the listing of one directory
+        old_dirs = {
+            name for name, in self.conn.execute(
+                "SELECT name FROM entries WHERE parent = ? AND is_dir = 1", (path,)
+            )
+        }
+        self.conn.execute("DELETE FROM entries WHERE parent = ?", (path,))
+        self.conn.executemany(
+            "INSERT INTO entries (path, parent, name, name_lower, is_dir) VALUES (?, ?, ?, ?, ?)",
+            [(os.path.join(path, name), path, name, name.lower(), int(is_dir))
+             for name, is_dir in entries if not (is_dir and name in self.ignored)],
+        )
+        self.conn.execute("INSERT OR REPLACE INTO dirs (path, mtime) VALUES (?, ?)", (path, mtime))
+
+        new_dirs = {name for name, is_dir in entries if is_dir}
+        for name in old_dirs - new_dirs:
+            self._forget(os.path.join(path, name))
+
+    def refresh(self, root, force=False):
+        """
+        Bring the index of root up to date, listing only the directories that changed.
+        Returns the number of directories listed again.
+        """
+        root = os.path.abspath(root)
+        with self.lock:
+            row = self.conn.execute("SELECT refreshed FROM roots WHERE path = ?", (root,)).fetchone()
+            if not force and row and time.time() - row[0] < self.refresh_interval:
+                return 0
+
+            start = time.perf_counter()
+            known = dict(self.conn.execute(
+                "SELECT path, mtime FROM dirs WHERE path = ? OR (path >= ? AND path < ?)", (root, *_subtree(root))
+            ))
+            visited = listed = 0
+
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="file-index") as pool:
+                pending = {pool.submit(_scan, root, known.get(root)): root}
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        path = pending.pop(future)
+                        mtime, entries = future.result()
+                        visited += 1
+
+                        if mtime is None:
+                            self._forget(path)  # gone or not readable
+                            continue
+                        if entries is None:
+                            children = [name for name, in self.conn.execute(
+                                "SELECT name FROM entries WHERE parent = ? AND is_dir = 1", (path,)
+                            )]
+                        else:
+                            self._store(path, mtime, entries)
+                            children = [name for name, is_dir in entries if is_dir and name not in self.ignored]
+                            listed += 1
+                            if listed % _COMMIT_EVERY == 0:
+                                self.conn.commit()
+
+                        for name in children:
+                            child = os.path.join(path, name)
+                            pending[pool.submit(_scan, child, known.get(child))] = child
+
+            self.conn.execute("INSERT OR REPLACE INTO roots (path, refreshed) VALUES (?, ?)", (root, time.time()))
+            self.conn.commit()
+
+        print(f"File index of {root}: {visited} folders checked, {listed} listed again "
+              f"in {time.perf_counter() - start:.2f}s")
+        return listed
+
+    def ensure(self, root, force=False):
+        """Refresh the indexed root containing root, or index root if none does."""
+        root = os.path.abspath(root)
+        with self.lock:
+            indexed = self._indexed_root(root)
+        self.refresh(indexed or root, force=force)
+
+    #********** Searching **********
+
+    def search(self, name, root=None, mode="exact", limit=50):
+        """
+        Paths of entries whose name matches, as (path, is_dir) pairs, at most limit of them.
+        mode is "exact" (case-insensitive), "prefix" or "fuzzy" (best matches first).
+        """
+        query = name.lower()
+        where, args = "", []
+        if root:
+            where = " AND e.path >= ? AND e.path < ?"
+            args = list(_subtree(os.path.abspath(root)))
+
+        with self.lock:
+            if mode == "exact":
+                rows = self.conn.execute(
+                    f"SELECT e.path, e.is_dir FROM entries e WHERE e.name_lower = ?{where} ORDER BY e.path LIMIT ?",
+                    [query, *args, limit],
+                ).fetchall()
+            elif mode == "prefix":
+                rows = self.conn.execute(
+                    f"SELECT e.path, e.is_dir FROM entries e WHERE e.name_lower >= ? AND e.name_lower < ?{where} "
+                    "ORDER BY length(e.name), e.path LIMIT ?",
+                    [query, query + "\uffff", *args, limit],
+                ).fetchall()
+            elif mode == "fuzzy":
+                return self._fuzzy(query, where, args, limit)
+            else:
+                raise ValueError(f"Unknown search mode: {mode}")
+        return [(path, bool(is_dir)) for path, is_dir in rows]
+
+    def _fuzzy(self, query, where, args, limit):
+        # Candidates share trigrams with the query; they are then ranked by similarity
+        trigrams = {query[i:i + 3] for i in range(len(query) - 2)}
+        if trigrams:
+            match = " OR ".join('"' + t.replace('"', '""') + '"' for t in trigrams)
+            rows = self.conn.execute(
+                "SELECT e.path, e.is_dir, e.name_lower FROM names_fts JOIN entries e ON e.id = names_fts.rowid "
+                f"WHERE names_fts MATCH ?{where} ORDER BY bm25(names_fts) LIMIT ?",
+                [match, *args, limit * 20],
+            ).fetchall()
+        else:
+            # Too short for trigrams
+            rows = self.conn.execute(
+                f"SELECT e.path, e.is_dir, e.name_lower FROM entries e WHERE instr(e.name_lower, ?) > 0{where} LIMIT ?",
+                [query, *args, limit * 20],
+            ).fetchall()
+
+        scored = [(difflib.SequenceMatcher(None, query, r[2]).ratio(), r) for r in rows]
+        scored = sorted((item for item in scored if item[0] >= MIN_SIMILARITY), key=lambda item: -item[0])
+        return [(path, bool(is_dir)) for _, (path, is_dir, _) in scored[:limit]]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
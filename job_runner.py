@@ -0,0 +1,153 @@
+"""
+Background jobs for menu actions.
+
+A job runs on a worker thread so the menu bar never freezes. Asking for a job that is
+already running does not start it again: the caller just waits for the same result.
+Jobs can be cancelled (they check job.cancelled() between steps). A cancelled run may still
+be busy in a step it cannot interrupt, so asking for the job again meanwhile queues one
+fresh run that starts when the cancelled one ends. Progress, results and errors are
+handed back to the UI thread, which calls poll() on a timer.
+Nothing here depends on rumps, so the runner can be used and checked on any platform.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobCancelled(Exception):
+    """Raised inside a job to stop it after cancel() was called."""
+
+#----------------------------------------------------------------------------
+# Jobs
+#----------------------------------------------------------------------------
+
+class Job:
+    """One run of a named job. The job function receives it to check for cancellation and report progress."""
+
+    def __init__(self, name, runner):
+        self.name = name
+        self.runner = runner
+        self.cancel_event = threading.Event()
+        self.on_done = []
+        self.on_error = []
+        self.on_progress = []
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        if self.cancelled():
+            raise JobCancelled(self.name)
+
+    def progress(self, message):
+        for callback in list(self.on_progress):
+            self.runner.deliver(callback, message)
+
+
+class JobRunner:
+    """
+    Runs jobs on a small thread pool.
+    Callbacks go into a queue that the UI thread empties with poll(); pass deliver to
+    hand them to another UI loop instead.
+    """
+
+    def __init__(self, max_workers=2, deliver=None):
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.callbacks = queue.Queue()
+        self.lock = threading.Lock()
+        self.jobs = {}      # {name: Job} running, cancelled or not
+        self.queued = {}    # {name: (Job, fn)} waiting for a cancelled run of name to end
+        if deliver is not None:
+            self.deliver = deliver
+
+    def deliver(self, callback, *args):
+        self.callbacks.put((callback, args))
+
+    def poll(self):
+        """Run the callbacks waiting for the UI thread. Call this from the UI thread only."""
+        while True:
+            try:
+                callback, args = self.callbacks.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                callback(*args)
+            except Exception as e:
+                print(f"Error in job callback: {e}")
+
+    def submit(self, name, fn, on_done=None, on_error=None, on_progress=None):
+        """
+        Start fn(job) in the background, or join the run of name that is already going.
+        on_done(result), on_error(exception) and on_progress(message) are called on the UI thread.
+        A cancelled job calls neither on_done nor on_error.
+        """
+        with self.lock:
+            job = self.jobs.get(name)
+            started = job is None
+            if started:
+                job = Job(name, self)
+                self.jobs[name] = job
+            elif job.cancelled():
+                # Never two runs at once: the fresh one waits for the cancelled one
+                job = self.queued.setdefault(name, (Job(name, self), fn))[0]
+            if on_done:
+                job.on_done.append(on_done)
+            if on_error:
+                job.on_error.append(on_error)
+            if on_progress:
+                job.on_progress.append(on_progress)
+
+        if started:
+            self.pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        try:
+            result = fn(job)
+            error = None
+        except Exception as e:
+            result, error = None, e
+
+        with self.lock:
+            if self.jobs.get(job.name) is job:
+                del self.jobs[job.name]
+            queued = self.queued.pop(job.name, None)
+            if queued is not None:
+                self.jobs[job.name] = queued[0]
+        if queued is not None:
+            self.pool.submit(self._run, *queued)
+
+        if job.cancelled() or isinstance(error, JobCancelled):
+            return
+        if error is not None:
+            for callback in job.on_error:
+                self.deliver(callback, error)
+        else:
+            for callback in job.on_done:
+                self.deliver(callback, result)
+
+    def cancel(self, name):
+        """
+        Ask a running job to stop. Returns False if no job of that name is running.
+        The run stays registered until it has really ended.
+        """
+        with self.lock:
+            queued = self.queued.pop(name, None)
+            if queued is not None:
+                queued[0].cancel_event.set()  # never started
+                return True
+            job = self.jobs.get(name)
+            if job is None or job.cancelled():
+                return False
+            job.cancel_event.set()
+            return True
+
+    def is_running(self, name):
+        """True while a run of name is going, even a cancelled one that has not ended yet."""
+        with self.lock:
+            return name in self.jobs
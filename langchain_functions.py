@@ -29,21 +29,30 @@ Author: Mohammadtaha Parsayan
 
 import os
 import sys
-import subprocess
-from langchain_community.document_loaders import PDFPlumberLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores.faiss import FAISS
-from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder
-from langchain_core.messages import HumanMessage, AIMessage
 from langchain_tavily import TavilySearch
 from langchain.agents import AgentExecutor, create_openai_functions_agent
 from langchain.tools import tool
-from macnotesapp import NotesApp
 from typing import Optional
 import datetime
-import sqlite3
+import threading
+import atexit
+from chat_store import ChatHistoryStore, DEFAULT_SESSION
+from conversation_memory import ConversationMemory, make_llm_summarizer
+from conversation_recall import ConversationRecall
+from agent_runtime import get_runtime, get_llm, get_embeddings, SharedEmbeddings
+from pdf_index_cache import PDFIndexCache, make_cache_key
+from embedding_store import EmbeddingStore, CachedEmbeddings
+from embedding_scheduler import EmbeddingScheduler
+from pdf_ingest import build_pdf_index
+from notes_index import NotesIndex, MacNotesProvider
+from notes_search import NoteVectorIndex
+from apple_bridge import AppleBridge
+from apple_cache import AppleDataCache
+from file_index import FileIndex
+from dir_listing import DirectoryCache, render_page, SORT_KEYS
+from corpus_index import CorpusIndex
 
 #----------------------------------------------------------------------------
 # Define resource paths
@@ -61,54 +70,71 @@ def resource_path(relative_path):
 # SQLite database setup
 #----------------------------------------------------------------------------
 
-# SQLite load chat history from database
-def load_chat_history_from_database():
+# One shared store for the whole process; rows are written by a background thread
+_chat_store = None
+_chat_store_lock = threading.RLock()
 
-    # define the path to the database
-    user_dir = os.path.expanduser("~/Library/Application Support/Majid")
-    db_path = os.path.join(user_dir, "chat_history.db")
+def get_chat_store():
+    global _chat_store
+    with _chat_store_lock:
+        if _chat_store is None:
+            _chat_store = ChatHistoryStore(background=True)
+            atexit.register(_chat_store.close)  # write what is still queued before exiting
+        return _chat_store
 
-    conn = sqlite3.connect(db_path) # Connect to the SQLite database
-    cursor = conn.cursor() # Create a cursor object to execute SQL commands
 
-    # Always try to create the table (harmless if it already exists)
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS history (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            role TEXT NOT NULL,
-            message TEXT NOT NULL,
-            timestamp TEXT NOT NULL
-        )
-    ''')
-    conn.commit()
+# How much history goes into the prompt
+CHAT_HISTORY_MAX_TOKENS = 3000
+
+
+# Older turns of a session, loaded on demand: the turns just before the message with row id before_id.
+# The prompt does not need them (the conversation memory summarizes and recalls older turns);
+# they are for showing or searching further back.
+def load_older_chat_history(before_id, max_turns=10, session_id=DEFAULT_SESSION):
+    return get_chat_store().load_before(before_id, max_turns=max_turns, session_id=session_id)
+
 
-    # Now read chat history
-    cursor.execute("SELECT role, message FROM history ORDER BY id ASC")
-    rows = cursor.fetchall()
-    history = []
-    for role, msg in rows:
-        if role == "human":
-            history.append(HumanMessage(content=msg))
-        else:
-            history.append(AIMessage(content=msg))
+# Long-term recall over past turns; one index shared by every session
+_conversation_recall = None
 
-    conn.close()  # optional but good practice
-    return history
+def get_conversation_recall():
+    global _conversation_recall
+    with _chat_store_lock:
+        if _conversation_recall is None:
+            _conversation_recall = ConversationRecall(get_chat_store(), SharedEmbeddings())
+        return _conversation_recall
+
+
+# Conversation memory of a session: recent turns verbatim plus a running summary of older ones
+def make_conversation_memory(session_id=DEFAULT_SESSION):
+    return ConversationMemory(
+        get_chat_store(),
+        make_llm_summarizer(lambda: get_llm(temperature=0)),
+        session_id=session_id,
+        max_tokens=CHAT_HISTORY_MAX_TOKENS,
+        recall=get_conversation_recall(),
+    )
+
+
+# Memory of the default session, used by the Tk chatbox
+_conversation_memory = None
+
+def get_conversation_memory():
+    global _conversation_memory
+    with _chat_store_lock:
+        if _conversation_memory is None:
+            _conversation_memory = make_conversation_memory()
+        return _conversation_memory
 
 
 # Save chat history in the database
-def save_message_in_database(role, message):
+def save_message_in_database(role, message, session_id=DEFAULT_SESSION):
+    get_chat_store().save_message(role, message, session_id=session_id)
 
-    # define the path to the database
-    user_dir = os.path.expanduser("~/Library/Application Support/Majid")
-    db_path = os.path.join(user_dir, "chat_history.db")
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    timestamp = datetime.datetime.now().isoformat()
-    cursor.execute("INSERT INTO history (role, message, timestamp) VALUES (?, ?, ?)",
-                   (role, message, timestamp))
-    conn.commit()
+# Save both messages of a turn in one transaction
+def save_turn_in_database(human_message, ai_message, session_id=DEFAULT_SESSION):
+    get_chat_store().save_turn(human_message, ai_message, session_id=session_id)
 
 #----------------------------------------------------------------------------
 # Tools for llm
@@ -123,72 +149,138 @@ To see how it works, add verbose=True to the agentExecutor in the create_chain f
 
 # ***** MacOS Apps *******
 
+# Local index of Apple Notes, refreshed with only the notes that changed
+NOTES_RESULT_LIMIT = 10
+NOTE_MAX_CHARS = 2000
+
+_notes_index = None
+_notes_index_lock = threading.Lock()
+
+def get_notes_index():
+    global _notes_index
+    with _notes_index_lock:
+        if _notes_index is None:
+            _notes_index = NotesIndex(MacNotesProvider())
+        return _notes_index
+
+
+# Vectors of note chunks, updated with the notes index
+NOTES_SEARCH_K = 5
+NOTE_SNIPPET_CHARS = 600
+
+_note_vectors = None
+
+def get_note_vectors():
+    global _note_vectors
+    index = get_notes_index()
+    with _notes_index_lock:
+        if _note_vectors is None:
+            _note_vectors = NoteVectorIndex(index, CachedEmbeddings(SharedEmbeddings(), store=embedding_store))
+        return _note_vectors
+
+
 @tool
 def get_apple_notes(query: str = "") -> str:
     """
-    Returns a string of notes matching the query text.
-    If query is empty, returns all notes.
+    Returns a string of the notes that best match the query words.
+    If query is empty, returns the most recently modified notes.
     """
-    notesapp = NotesApp()
-    all_notes = notesapp.notes()
+    index = get_notes_index()
+    index.refresh()
     results = []
-    for note in all_notes:
-        if query.lower() in note.body.lower() or query.lower() in note.name.lower():
-            results.append(f"{note.name}:\n{note.plaintext}\n---")
+    for note in index.search(query, limit=NOTES_RESULT_LIMIT):
+        text = note["text"]
+        if len(text) > NOTE_MAX_CHARS:
+            text = text[:NOTE_MAX_CHARS] + " ..."
+        results.append(f"{note['name']}:\n{text}\n---")
     return "\n\n".join(results) if results else "No matching notes found."
 
 
 @tool
-def get_apple_reminders(list_name: str = "") -> str:
+def search_notes(query: str, k: int = NOTES_SEARCH_K) -> str:
     """
-    Fetches reminders fresh from Apple Reminders app, no caching.
+    Finds the parts of Apple Notes most related to the question, even if worded differently.
+    Returns the k best snippets with the title of their note.
     """
-    refresh_script = '''
-    tell application "Reminders" to quit
-    '''
+    try:
+        vectors = get_note_vectors()
+        get_notes_index().refresh()
+        vectors.sync()  # catches up with notes indexed before the vectors existed
+        results = []
+        for hit in vectors.search(query, k=k, hybrid=True):
+            text = hit["text"]
+            if len(text) > NOTE_SNIPPET_CHARS:
+                text = text[:NOTE_SNIPPET_CHARS] + " ..."
+            results.append(f"{hit['name']}:\n{text}\n---")
+        return "\n\n".join(results) if results else "No matching notes found."
 
-    subprocess.run(["osascript", "-e", refresh_script], check=True)
+    except Exception as e:
+        print(f"Error searching notes: {e}")
+        return f"Error searching notes: {e}"
 
-    try:
-        if list_name:
-            script = f'''
-            tell application "Reminders"
-                set theTodos to ""
-                set theDones to ""
-                repeat with r in reminders of list "{list_name}"
-                    if completed of r is false then
-                        set theTodos to theTodos & "• " & name of r & linefeed
-                    else
-                        set theDones to theDones & "✔ " & name of r & linefeed
-                    end if
-                end repeat
-                return theTodos & "<--SPLIT-->" & theDones
-            end tell
-            '''
-        else:
-            script = '''
-            tell application "Reminders"
-                set theTodos to ""
-                set theDones to ""
-                repeat with l in lists
-                    repeat with r in reminders of l
-                        if completed of r is false then
-                            set theTodos to theTodos & "• " & name of r & " (" & name of l & ")" & linefeed
-                        else
-                            set theDones to theDones & "✔ " & name of r & " (" & name of l & ")" & linefeed
-                        end if
-                    end repeat
-                end repeat
-                return theTodos & "<--SPLIT-->" & theDones
-            end tell
-            '''
-        result = subprocess.check_output(["osascript", "-e", script]).decode().strip()
-
-        # process and return output here (same as before)
-        # ...
-
-        return result  # raw output or formatted string
 
+# One long-lived helper process for Reminders and Calendar
+CALENDAR_NAMES = ["Home"]
+
+_apple_bridge = None
+_apple_bridge_lock = threading.Lock()
+
+def get_apple_bridge():
+    global _apple_bridge
+    with _apple_bridge_lock:
+        if _apple_bridge is None:
+            _apple_bridge = AppleBridge()
+            atexit.register(_apple_bridge.close)
+        return _apple_bridge
+
+
+# Reminders and events cached in SQLite; each sync only fetches what changed
+_apple_cache = None
+
+def get_apple_cache():
+    global _apple_cache
+    bridge = get_apple_bridge()
+    with _apple_bridge_lock:
+        if _apple_cache is None:
+            _apple_cache = AppleDataCache(bridge)
+        return _apple_cache
+
+
+def reminders_text(list_name="", timeout=None):
+    """
+    Reminders as text, pending ones first. timeout limits the call to the helper (None: the bridge's own).
+    Errors are raised, so the summary can tell a failed source from an empty one.
+    """
+    reminders = get_apple_cache().reminders(list_name=list_name or None, timeout=timeout)
+
+    def line(mark, r):
+        return f"{mark} {r.name}" if list_name else f"{mark} {r.name} ({r.list})"
+
+    todos = [line("•", r) for r in reminders if not r.completed]
+    dones = [line("✔", r) for r in reminders if r.completed]
+    return (
+        "Pending:\n" + ("\n".join(todos) or "(none)")
+        + "\n\nCompleted:\n" + ("\n".join(dones) or "(none)")
+    )
+
+
+def calendar_events_text(timeout=None):
+    """Today's events as text. timeout limits the call to the helper (None: the bridge's own); errors are raised."""
+    day_start = datetime.datetime.now().astimezone().replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = day_start + datetime.timedelta(days=1)
+    events = get_apple_cache().events(day_start, day_end, calendars=CALENDAR_NAMES, timeout=timeout)
+
+    lines = [f"[{e.calendar}] {e.summary} at {e.start_time().strftime('%H:%M')}" for e in events]
+    return "\n".join(lines) if lines else "No events today."
+
+
+@tool
+def get_apple_reminders(list_name: str = "") -> str:
+    """
+    Fetches reminders from the Apple Reminders app, pending ones first, then completed ones.
+    """
+    try:
+        return reminders_text(list_name)
     except Exception as e:
         return f"Error fetching reminders: {e}"
 
@@ -196,35 +288,10 @@ def get_apple_reminders(list_name: str = "") -> str:
 @tool
 def read_calendar_events(query: str = "") -> str:
     """Reads today's calendar events from the macOS Calendar app."""
-
-    script = '''
-    set output to ""
-    set todayStart to current date
-    set hours of todayStart to 0
-    set minutes of todayStart to 0
-    set seconds of todayStart to 0
-    set todayEnd to todayStart + (1 * days)
-
-    tell application "Calendar"
-        set cal to calendar "Home"
-        set theEvents to every event of cal whose start date ≥ todayStart and start date < todayEnd
-        repeat with e in theEvents
-            set eventSummary to summary of e
-            set eventStart to start date of e
-            set eventCalendar to name of cal
-            set output to output & "[" & eventCalendar & "] " & eventSummary & " at " & eventStart & linefeed
-        end repeat
-    end tell
-
-    return output
-    '''
-
     try:
-        result = subprocess.run(["osascript", "-e", script], capture_output=True, text=True)
-        return result
-    
+        return calendar_events_text()
     except Exception as e:
-        return f"Error fetching reminders: {e}"
+        return f"Error fetching calendar events: {e}"
     
 
 @tool
@@ -242,10 +309,18 @@ def get_current_time_and_date() -> str:
 
 # ***** File Management Tools *******
 
+# Listings read with os.scandir and reused for a few seconds while the folder is unchanged
+directory_cache = DirectoryCache()
+
+
+def _name_only(entry, details):
+    return entry.name + ("/" if entry.is_dir else "")
+
+
 @tool
-def list_files(path: Optional[str] = None) -> str:
+def list_files(path: Optional[str] = None, page: int = 1) -> str:
     """
-    List all files and folders in the specified directory path.
+    List the files and folders in the specified directory path, up to 100 per page (folders end with /).
     If path is None, use the base folder as /Users.
     """
     if not path:
@@ -256,59 +331,89 @@ def list_files(path: Optional[str] = None) -> str:
     if not os.path.isdir(path):
         return f"Path is not a directory: {path}"
 
-    files = os.listdir(path)
-    if not files:
+    try:
+        entries = directory_cache.entries(path)
+    except OSError as e:
+        return f"Could not read {path}: {e}"
+    if not entries:
         return f"No files found in directory: {path}"
-    
-    return f"Files in {path}:\n" + "\n".join(files)
+
+    return render_page(path, entries, page=page, formatter=_name_only)
+
+
+# Index of file and folder names, refreshed only where folders changed
+FILE_SEARCH_LIMIT = 50
+FUZZY_SEARCH_LIMIT = 10
+
+_file_index = None
+_file_index_lock = threading.Lock()
+
+def get_file_index():
+    global _file_index
+    with _file_index_lock:
+        if _file_index is None:
+            _file_index = FileIndex()
+        return _file_index
 
 
 @tool
-def find_file_or_folder(name: str, search_root: Optional[str] = None) -> str:
+def find_file_or_folder(name: str, search_root: Optional[str] = None, match: str = "exact") -> str:
     """
-    Searches for a file or folder by exact name starting from a given directory.
+    Searches for a file or folder by name starting from a given directory.
     If search_root is None, use the base folder.
+    match is "exact" (the whole name, any case), "prefix" (names starting with name)
+    or "fuzzy" (similar names, for when the exact spelling is not known).
     """
     if not search_root:
         search_root = resource_path("")
-
-    matches = []
-    for root, dirs, files in os.walk(search_root):
-        if name in files:
-            matches.append(os.path.join(root, name))
-        if name in dirs:
-            matches.append(os.path.join(root, name))
+    if not os.path.isdir(search_root):
+        return f"Path is not a directory: {search_root}"
+    if match not in ("exact", "prefix", "fuzzy"):
+        return f"Unknown match type: {match}. Use exact, prefix or fuzzy."
+
+    index = get_file_index()
+    index.ensure(search_root)
+    limit = FUZZY_SEARCH_LIMIT if match == "fuzzy" else FILE_SEARCH_LIMIT
+    matches = index.search(name, root=search_root, mode=match, limit=limit + 1)
+    if not matches:
+        # The index may be a few minutes old: check the folders again before saying no
+        index.ensure(search_root, force=True)
+        matches = index.search(name, root=search_root, mode=match, limit=limit + 1)
 
     if not matches:
         return f"No file or folder named '{name}' found under {search_root}."
-    
-    return f"Found {len(matches)} match(es):\n" + "\n".join(matches)
+
+    more = len(matches) > limit
+    lines = [path + ("/" if is_dir else "") for path, is_dir in matches[:limit]]
+    header = f"Found {'more than ' if more else ''}{len(lines)} match(es):\n"
+    return header + "\n".join(lines)
 
 
 @tool
-def browse_folder(path: str = "/Users/taha/Documents") -> str:
+def browse_folder(path: str = "/Users/taha/Documents", page: int = 1, sort_by: str = "name",
+                  details: bool = False) -> str:
     """
     Browse a folder interactively.
-    - Lists files and subfolders.
+    - Lists files and subfolders, up to 100 per page; ask for the next page if there are more.
     - Returns an easy-to-read list with type indicators.
+    - sort_by is "name" (folders first), "mtime" (newest first) or "size" (largest first).
+    - details=True adds the size and modification date of each item.
     """
     if not os.path.exists(path):
         return f"Path does not exist: {path}"
     if not os.path.isdir(path):
         return f"Path is not a directory: {path}"
+    if sort_by not in SORT_KEYS:
+        return f"Unknown sort_by: {sort_by}. Use name, mtime or size."
 
-    items = os.listdir(path)
-    if not items:
+    try:
+        entries = directory_cache.entries(path, with_stat=details or sort_by != "name")
+    except OSError as e:
+        return f"Could not read {path}: {e}"
+    if not entries:
         return f"No files or folders in {path}"
 
-    output = [f"Contents of {path}:"]
-    for item in items:
-        full_path = os.path.join(path, item)
-        if os.path.isdir(full_path):
-            output.append(f"[Folder] {item}")
-        else:
-            output.append(f"[File]   {item}")
-    return "\n".join(output)
+    return render_page(path, entries, page=page, sort_by=sort_by, details=details)
 
 
 @tool
@@ -325,6 +430,18 @@ def select_item(folder_path: str, item_name: str) -> str:
 
 # ***** PDF Tools *******
 
+PDF_CHUNK_SIZE = 500
+PDF_CHUNK_OVERLAP = 50
+
+# FAISS index type of big PDFs: "flat" (exact), "ivfpq" or "hnsw" (see ann_index)
+PDF_INDEX_TYPE = "hnsw"
+
+# Saved FAISS indexes of the PDFs we have already read
+pdf_index_cache = PDFIndexCache()
+
+# Vectors of every chunk we have embedded, so edited PDFs only re-embed the changed chunks
+embedding_store = EmbeddingStore()
+
 @tool
 def ask_about_pdf(pdf_path: str, question: str) -> str:
     """
@@ -338,18 +455,26 @@ def ask_about_pdf(pdf_path: str, question: str) -> str:
         return f"Provided path is not a PDF file: {pdf_path}"
     
     try:
-        # Load and chunk the PDF document
-        loader = PDFPlumberLoader(pdf_path)
-        docs = loader.load()
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=50,
-        )
-        split_docs = splitter.split_documents(docs)
+        embedding = get_embeddings()
+
+        # Reuse the saved index if this exact PDF was already read with the same settings
+        cache_key = make_cache_key(pdf_path, PDF_CHUNK_SIZE, PDF_CHUNK_OVERLAP, embedding.model, PDF_INDEX_TYPE)
+        vectorstore = pdf_index_cache.load(cache_key, embedding)
+
+        if vectorstore is None:
+            splitter = RecursiveCharacterTextSplitter(
+                chunk_size=PDF_CHUNK_SIZE,
+                chunk_overlap=PDF_CHUNK_OVERLAP,
+            )
+
+            # Create embeddings and vector store, embedding only chunks we have not seen before.
+            # Pages are read lazily and embedded in windows, so big PDFs are never fully in memory
+            cached_embedding = CachedEmbeddings(embedding, store=embedding_store)
+            scheduler = EmbeddingScheduler(cached_embedding)
+            vectorstore = build_pdf_index(pdf_path, splitter, scheduler, index_type=PDF_INDEX_TYPE)
+            print(f"PDF chunks embedded: {cached_embedding.misses}, reused from cache: {cached_embedding.hits}")
+            pdf_index_cache.save(cache_key, vectorstore, pdf_path)
 
-        # Create embeddings and vector store
-        embedding = OpenAIEmbeddings()
-        vectorstore = FAISS.from_documents(split_docs, embedding=embedding)
         retriever = vectorstore.as_retriever(search_kwargs={"k": 5})  # Convert vector store into a retriever
 
         # Retrieve relevant chunks
@@ -357,7 +482,7 @@ def ask_about_pdf(pdf_path: str, question: str) -> str:
         context = "\n\n".join([doc.page_content for doc in relevant_docs])
 
         # Use LLM to answer based on retrieved chunks
-        llm = ChatOpenAI(model_name="gpt-3.5-turbo", temperature=1)
+        llm = get_llm()
         prompt = f"Your name is Majid. Answer the following question based on the context below.\n\nContext:\n{context}\n\nQuestion: {question}"
         response = llm.invoke(prompt)
 
@@ -368,17 +493,89 @@ def ask_about_pdf(pdf_path: str, question: str) -> str:
         return f"Error processing PDF file: {e}"
 
 
+# ***** Document Corpus Tools *******
+
+# Folders of PDFs, text and markdown indexed in the background
+CORPUS_SEARCH_K = 6
+
+# Vectors of the corpus stay in a memory-mapped file rather than in the app's memory
+CORPUS_STORE = "mmap"
+
+# Index type of the FAISS shards when CORPUS_STORE is "faiss"
+CORPUS_INDEX_TYPE = "ivfpq"
+
+_corpus_index = None
+_corpus_index_lock = threading.Lock()
+
+def get_corpus_index():
+    global _corpus_index
+    with _corpus_index_lock:
+        if _corpus_index is None:
+            scheduler = EmbeddingScheduler(CachedEmbeddings(SharedEmbeddings(), store=embedding_store))
+            splitter = RecursiveCharacterTextSplitter(chunk_size=PDF_CHUNK_SIZE, chunk_overlap=PDF_CHUNK_OVERLAP)
+            _corpus_index = CorpusIndex(scheduler, splitter, store=CORPUS_STORE, index_type=CORPUS_INDEX_TYPE)
+            if _corpus_index.folders():
+                _corpus_index.start()  # keeps the index in step with the folders
+            # A sync that failed without the API keys is run again as soon as they are saved
+            get_runtime().add_listener(_corpus_index.request_sync)
+        return _corpus_index
+
+
+@tool
+def add_documents_folder(folder_path: str) -> str:
+    """
+    Adds a folder of PDF, text and markdown files to Majid's document library.
+    The files are indexed in the background, so ask_documents can answer questions about them.
+    """
+    if not os.path.isdir(folder_path):
+        return f"Path is not a directory: {folder_path}"
+    corpus = get_corpus_index()
+    corpus.add_folder(folder_path)
+    corpus.request_sync()
+    return f"Added {folder_path} to the document library. It is being indexed in the background."
+
+
+@tool
+def ask_documents(question: str) -> str:
+    """
+    Answers a question using every document in Majid's document library (the folders added
+    with add_documents_folder), and says which files the answer comes from.
+    """
+    try:
+        corpus = get_corpus_index()
+        if not corpus.folders():
+            return "The document library is empty. Add a folder with add_documents_folder first."
+
+        if corpus.last_sync is None:
+            corpus.request_sync()  # no sync has finished yet, e.g. the keys were missing at startup
+
+        hits = corpus.search(question, k=CORPUS_SEARCH_K)
+        if not hits:
+            return "Nothing has been indexed yet. Try again in a little while."
+
+        context = "\n\n".join(
+            f"[{os.path.basename(doc.metadata.get('source', ''))}] {doc.page_content}" for doc, _ in hits
+        )
+        sources = sorted({doc.metadata.get("source", "") for doc, _ in hits})
+
+        llm = get_llm()
+        prompt = f"Your name is Majid. Answer the following question based on the context below.\n\nContext:\n{context}\n\nQuestion: {question}"
+        response = llm.invoke(prompt)
+        return response.content + "\n\nSources:\n" + "\n".join(sources)
+
+    except Exception as e:
+        print(f"Error searching the documents: {e}")
+        return f"Error searching the documents: {e}"
+
+
 #----------------------------------------------------------------------------
 # Langchain functions
 #----------------------------------------------------------------------------
 
 def create_chain():
 
-    # llm model
-    model = ChatOpenAI(
-        model_name = "gpt-3.5-turbo",
-        temperature = 1
-    )
+    # llm model (shared client). streaming=True only adds token callbacks, invoke() still returns the full answer
+    model = get_llm(streaming=True)
 
     #prompt
     prompt = ChatPromptTemplate.from_messages([
@@ -414,9 +611,12 @@ def create_chain():
     tools = [
         search, 
         get_apple_notes,
+        search_notes,
         get_apple_reminders,
         read_calendar_events,
         ask_about_pdf,
+        add_documents_folder,
+        ask_documents,
         list_files,
         get_current_time_and_date,
         find_file_or_folder,
@@ -440,6 +640,11 @@ def create_chain():
     return agentExecutor  # Return the retrieval chain
 
 
+# The agent is built once per process and rebuilt only when the API keys change
+def get_agent_executor():
+    return get_runtime().get("agent_executor", create_chain)
+
+
 # Function to ask a question
 def process_chat(agentExecutor, question, history):
     response = agentExecutor.invoke({
@@ -14,6 +14,13 @@ Author: Taha Parsayan
 
 import os
 import sys
+import multiprocessing
+
+# Worker processes of the frozen app (PDF text extraction) start from this file too:
+# freeze_support() runs them here and exits, before the app and its heavy imports are loaded
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+
 import subprocess
 from dotenv import load_dotenv
 
@@ -0,0 +1,264 @@
+"""
+Memory-mapped vector store on disk.
+
+Vectors are rows of a flat binary file (float32, or float16 to halve the size) that is
+memory-mapped for searching, and the text and metadata of every row are in SQLite next to
+it. Opening a store only reads a few rows of SQLite, and a search scans the file block by
+block, so even a large collection does not stay in the process's memory: the pages of the
+file belong to the OS cache and are dropped under memory pressure.
+
+Rows are only ever appended. Deleting marks rows as deleted, and compact() rewrites the
+file without them. The row count in SQLite is the source of truth: bytes written past it by
+an append that did not finish are cut off when the store is opened again.
+
+A raw file is used rather than .npy because .npy keeps the shape in its header, which would
+have to be rewritten on every append.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import json
+import mmap
+import sqlite3
+import threading
+import numpy as np
+
+# Bytes of float32 vectors scored (or copied by compact) at a time. The float32 copy of a
+# block is all the memory a search allocates, whatever the size of the store.
+SEARCH_BLOCK_BYTES = 8 << 20
+
+# Pages of a block are released from the process once it is scored (they stay in the OS cache)
+_DONTNEED = getattr(mmap, "MADV_DONTNEED", None)
+
+DTYPES = {"float32": np.float32, "float16": np.float16}
+
+#----------------------------------------------------------------------------
+# Store
+#----------------------------------------------------------------------------
+
+class MmapVectorStore:
+    """
+    Append-only store of normalised vectors, searched by cosine similarity.
+    dim and dtype are fixed when the store is created; opening an existing store reads them back.
+    """
+
+    def __init__(self, directory, dim=None, dtype="float32"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.vectors_path = os.path.join(directory, "vectors.bin")
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(directory, "meta.db"), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+
+        with self.lock, self.conn:
+            self.conn.execute("CREATE TABLE IF NOT EXISTS info (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS rows (
+                    id INTEGER PRIMARY KEY,
+                    source TEXT,
+                    text TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    deleted INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_rows_source ON rows (source)")
+            info = dict(self.conn.execute("SELECT key, value FROM info"))
+
+        if info:
+            self.dim = int(info["dim"])
+            self.dtype = info["dtype"]
+            if dim is not None and dim != self.dim:
+                raise ValueError(f"Store has {self.dim} dimensions, not {dim}")
+        else:
+            if dtype not in DTYPES:
+                raise ValueError(f"Unknown dtype: {dtype}")
+            self.dim = dim
+            self.dtype = dtype
+            if dim is not None:
+                self._save_info()
+
+        self.count = self._row_count()
+        self.deleted = {row[0] for row in self.conn.execute("SELECT id FROM rows WHERE deleted = 1")}
+        self.matrix = None
+        self.mapping = None
+        self._truncate_tail()
+
+    def _save_info(self):
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO info (key, value) VALUES (?, ?)",
+                [("dim", str(self.dim)), ("dtype", self.dtype)],
+            )
+
+    def _row_count(self):
+        return self.conn.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM rows").fetchone()[0]
+
+    @property
+    def row_bytes(self):
+        return self.dim * np.dtype(DTYPES[self.dtype]).itemsize
+
+    def _truncate_tail(self):
+        # Drop bytes of an append that was not recorded in SQLite
+        if self.dim is None or not os.path.exists(self.vectors_path):
+            return
+        expected = self.count * self.row_bytes
+        if os.path.getsize(self.vectors_path) > expected:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(expected)
+
+    def _block_rows(self):
+        return max(1, SEARCH_BLOCK_BYTES // (self.dim * 4))
+
+    def _map(self):
+        # Map the rows written so far; remapped after appends
+        if self.matrix is None or len(self.matrix) != self.count:
+            self.matrix = self.mapping = None
+            if self.count == 0:
+                self.matrix = np.empty((0, self.dim or 0), dtype=DTYPES[self.dtype])
+            else:
+                with open(self.vectors_path, "rb") as f:
+                    self.mapping = mmap.mmap(f.fileno(), self.count * self.row_bytes, access=mmap.ACCESS_READ)
+                self.matrix = np.frombuffer(
+                    self.mapping, dtype=DTYPES[self.dtype], count=self.count * self.dim
+                ).reshape(self.count, self.dim)
+        return self.matrix
+
+    def _release(self, start, end):
+        # Let the process drop the pages of rows start..end; reading them again faults them back in
+        if _DONTNEED is None or self.mapping is None:
+            return
+        first = start * self.row_bytes // mmap.PAGESIZE * mmap.PAGESIZE
+        try:
+            self.mapping.madvise(_DONTNEED, first, end * self.row_bytes - first)
+        except OSError:
+            pass
+
+    def __len__(self):
+        return self.count - len(self.deleted)
+
+    #********** Writing **********
+
+    def append(self, vectors, texts, metadatas=None, source=None):
+        """Add rows and return their ids. source groups rows so they can be deleted together."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or len(vectors) != len(texts):
+            raise ValueError("Need one vector per text")
+        if len(vectors) == 0:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+
+        with self.lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                self._save_info()
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Store has {self.dim} dimensions, not {vectors.shape[1]}")
+
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+            with open(self.vectors_path, "ab") as f:
+                f.write(vectors.astype(DTYPES[self.dtype]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            ids = list(range(self.count, self.count + len(vectors)))
+            with self.conn:
+                self.conn.executemany(
+                    "INSERT INTO rows (id, source, text, metadata) VALUES (?, ?, ?, ?)",
+                    [(i, source, text, json.dumps(meta, default=str)) for i, text, meta in zip(ids, texts, metadatas)],
+                )
+            self.count += len(ids)
+            return ids
+
+    def delete(self, ids):
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE rows SET deleted = 1 WHERE id = ?", [(int(i),) for i in ids])
+            self.deleted.update(int(i) for i in ids)
+
+    def delete_source(self, source):
+        """Delete every row appended with source. Returns how many were deleted."""
+        with self.lock:
+            ids = [row[0] for row in self.conn.execute(
+                "SELECT id FROM rows WHERE source = ? AND deleted = 0", (source,)
+            )]
+        self.delete(ids)
+        return len(ids)
+
+    def compact(self):
+        """Rewrite the store without its deleted rows. Row ids change."""
+        with self.lock:
+            if not self.deleted:
+                return
+            keep = [row[0] for row in self.conn.execute("SELECT id FROM rows WHERE deleted = 0 ORDER BY id")]
+            matrix = self._map()
+
+            tmp_path = self.vectors_path + ".tmp"
+            block_rows = self._block_rows()
+            with open(tmp_path, "wb") as f:
+                for start in range(0, len(keep), block_rows):
+                    f.write(np.ascontiguousarray(matrix[keep[start:start + block_rows]]).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            with self.conn:
+                self.conn.execute("DELETE FROM rows WHERE deleted = 1")
+                self.conn.execute("UPDATE rows SET id = -1 - id")  # two steps to avoid id clashes
+                self.conn.executemany(
+                    "UPDATE rows SET id = ? WHERE id = ?", [(new, -1 - old) for new, old in enumerate(keep)]
+                )
+            self.matrix = self.mapping = None
+            os.replace(tmp_path, self.vectors_path)
+            self.count = len(keep)
+            self.deleted = set()
+
+    #********** Reading **********
+
+    def search(self, vector, k=5):
+        """
+        The k rows most similar to vector as (id, text, metadata, score) tuples, best first.
+        The score is the cosine similarity.
+        """
+        q = np.asarray(vector, dtype=np.float32)
+        q = q / max(np.linalg.norm(q), 1e-12)
+
+        with self.lock:
+            if self.count == 0:
+                return []
+            matrix = self._map()
+            deleted = np.fromiter(self.deleted, dtype=np.int64) if self.deleted else None
+
+            block_rows = self._block_rows()
+            best_ids = np.empty(0, dtype=np.int64)
+            best_scores = np.empty(0, dtype=np.float32)
+            for start in range(0, len(matrix), block_rows):
+                block = np.asarray(matrix[start:start + block_rows], dtype=np.float32)
+                scores = block @ q
+                ids = np.arange(start, start + len(block))
+                del block
+                self._release(start, ids[-1] + 1)
+                if deleted is not None:
+                    keep = ~np.isin(ids, deleted)
+                    scores, ids = scores[keep], ids[keep]
+                # Keep the k best of what was seen so far
+                best_ids = np.concatenate([best_ids, ids])
+                best_scores = np.concatenate([best_scores, scores])
+                if len(best_scores) > k:
+                    top = np.argpartition(-best_scores, k)[:k]
+                    best_ids, best_scores = best_ids[top], best_scores[top]
+
+            hits = []
+            for i in np.argsort(-best_scores):
+                row_id = int(best_ids[i])
+                text, metadata = self.conn.execute(
+                    "SELECT text, metadata FROM rows WHERE id = ?", (row_id,)
+                ).fetchone()
+                hits.append((row_id, text, json.loads(metadata), float(best_scores[i])))
+            return hits
+
+    def close(self):
+        with self.lock:
+            self.matrix = self.mapping = None
+            self.conn.close()
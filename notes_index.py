@@ -0,0 +1,228 @@
+"""
+Local full-text index of Apple Notes.
+
+Notes are copied into a SQLite FTS5 table keyed by note id and modification date. A refresh
+only lists the ids and modification dates of the notes, then reads the text of the notes
+that are new or changed and drops the ones that were deleted. Searches run on the index,
+ranked by relevance (a match in the title counts more than one in the body), with a limit.
+
+Notes come from a provider with two methods, list_notes() and read_notes(ids), so the index
+can be filled from something other than the Notes app, e.g. MemoryNotesProvider.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import re
+import time
+import sqlite3
+import threading
+
+user_dir = os.path.expanduser("~/Library/Application Support/Majid")
+INDEX_PATH = os.path.join(user_dir, "notes_index.db")
+
+# Seconds during which the index is considered fresh and the Notes app is not asked again
+REFRESH_INTERVAL = 60
+
+#----------------------------------------------------------------------------
+# Providers
+#----------------------------------------------------------------------------
+
+class MacNotesProvider:
+    """Notes from the Notes app through macnotesapp."""
+
+    def __init__(self):
+        self.notes = {}
+
+    def list_notes(self):
+        """{note_id: modification timestamp} of every note."""
+        from macnotesapp import NotesApp
+
+        self.notes = {note.id: note for note in NotesApp().notes()}
+        return {note_id: note.modification_date.timestamp() for note_id, note in self.notes.items()}
+
+    def read_notes(self, note_ids):
+        """Records of the given notes, from the last list_notes()."""
+        records = []
+        for note_id in note_ids:
+            note = self.notes.get(note_id)
+            if note is None:
+                continue
+            records.append({
+                "id": note_id,
+                "name": note.name,
+                "folder": note.folder,
+                "modified": note.modification_date.timestamp(),
+                "text": note.plaintext,
+            })
+        return records
+
+
+class MemoryNotesProvider:
+    """Notes kept in a dict of {note_id: {"name", "text", "modified", "folder"}}; used for checks."""
+
+    def __init__(self, notes=None):
+        self.notes = dict(notes or {})
+        self.reads = 0  # notes read so far, to see what a refresh re-read
+
+    def list_notes(self):
+        return {note_id: note["modified"] for note_id, note in self.notes.items()}
+
+    def read_notes(self, note_ids):
+        records = []
+        for note_id in note_ids:
+            note = self.notes[note_id]
+            self.reads += 1
+            records.append({
+                "id": note_id,
+                "name": note.get("name", ""),
+                "folder": note.get("folder", ""),
+                "modified": note["modified"],
+                "text": note.get("text", ""),
+            })
+        return records
+
+#----------------------------------------------------------------------------
+# Index
+#----------------------------------------------------------------------------
+
+def fts_query(query):
+    """FTS5 query matching notes that contain every word of query (as a word prefix)."""
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+class NotesIndex:
+    """Full-text index of notes, refreshed incrementally from a provider."""
+
+    def __init__(self, provider, db_path=INDEX_PATH, refresh_interval=REFRESH_INTERVAL):
+        self.provider = provider
+        self.db_path = db_path
+        self.refresh_interval = refresh_interval
+        self.last_refresh = None
+        self.listeners = []
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS notes (
+                    rowid INTEGER PRIMARY KEY,
+                    note_id TEXT UNIQUE NOT NULL,
+                    modified REAL NOT NULL,
+                    name TEXT NOT NULL,
+                    folder TEXT NOT NULL,
+                    text TEXT NOT NULL
+                )
+            ''')
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_notes_modified ON notes (modified)")
+            # Rows of notes_fts share their rowid with notes
+            self.conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5 (
+                    name, text, tokenize = 'unicode61 remove_diacritics 2'
+                )
+            ''')
+
+    def add_listener(self, listener):
+        """listener(changed_ids, deleted_ids) is called after each refresh that changed something."""
+        self.listeners.append(listener)
+
+    def refresh(self, force=False):
+        """
+        Bring the index up to date with the provider.
+        Returns (changed_ids, deleted_ids). Within refresh_interval of the last refresh nothing
+        is done unless force is True.
+        """
+        with self.lock:
+            now = time.monotonic()
+            if not force and self.last_refresh is not None and now - self.last_refresh < self.refresh_interval:
+                return [], []
+
+            listed = self.provider.list_notes()
+            known = dict(self.conn.execute("SELECT note_id, modified FROM notes"))
+            changed = [note_id for note_id, modified in listed.items() if known.get(note_id) != modified]
+            deleted = [note_id for note_id in known if note_id not in listed]
+
+            records = self.provider.read_notes(changed) if changed else []
+            with self.conn:
+                for note_id in deleted:
+                    self._delete(note_id)
+                for record in records:
+                    self._delete(record["id"])
+                    cursor = self.conn.execute(
+                        "INSERT INTO notes (note_id, modified, name, folder, text) VALUES (?, ?, ?, ?, ?)",
+                        (record["id"], record["modified"], record["name"] or "",
+                         str(record["folder"] or ""), record["text"] or ""),
+                    )
+                    self.conn.execute(
+                        "INSERT INTO notes_fts (rowid, name, text) VALUES (?, ?, ?)",
+                        (cursor.lastrowid, record["name"] or "", record["text"] or ""),
+                    )
+            self.last_refresh = now
+
+        if changed or deleted:
+            print(f"Notes index: {len(changed)} changed, {len(deleted)} deleted, {len(listed)} in total")
+            for listener in list(self.listeners):
+                try:
+                    listener(changed, deleted)
+                except Exception as e:
+                    print(f"Error in notes index listener: {e}")
+        return changed, deleted
+
+    def _delete(self, note_id):
+        row = self.conn.execute("SELECT rowid FROM notes WHERE note_id = ?", (note_id,)).fetchone()
+        if row:
+            self.conn.execute("DELETE FROM notes_fts WHERE rowid = ?", row)
+            self.conn.execute("DELETE FROM notes WHERE rowid = ?", row)
+
+    def search(self, query="", limit=10):
+        """
+        Best matching notes for query as dicts of id, name, folder, modified, text and score
+        (lower is better). With an empty query the most recently modified notes are returned.
+        """
+        match = fts_query(query)
+        with self.lock:
+            if match:
+                # bm25 with the title weighted five times more than the body
+                rows = self.conn.execute('''
+                    SELECT n.note_id, n.name, n.folder, n.modified, n.text, bm25(notes_fts, 5.0, 1.0) AS score
+                    FROM notes_fts JOIN notes n ON n.rowid = notes_fts.rowid
+                    WHERE notes_fts MATCH ?
+                    ORDER BY score
+                    LIMIT ?
+                ''', (match, limit)).fetchall()
+            else:
+                rows = self.conn.execute('''
+                    SELECT note_id, name, folder, modified, text, 0.0
+                    FROM notes ORDER BY modified DESC LIMIT ?
+                ''', (limit,)).fetchall()
+
+        keys = ("id", "name", "folder", "modified", "text", "score")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def versions(self):
+        """{note_id: modification timestamp} of every indexed note."""
+        with self.lock:
+            return dict(self.conn.execute("SELECT note_id, modified FROM notes"))
+
+    def get(self, note_ids):
+        """Indexed notes as {note_id: dict of id, name, folder, modified, text}."""
+        keys = ("id", "name", "folder", "modified", "text")
+        notes = {}
+        with self.lock:
+            for note_id in note_ids:
+                row = self.conn.execute(
+                    "SELECT note_id, name, folder, modified, text FROM notes WHERE note_id = ?", (note_id,)
+                ).fetchone()
+                if row:
+                    notes[note_id] = dict(zip(keys, row))
+        return notes
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
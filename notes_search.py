@@ -0,0 +1,203 @@
+"""
+Semantic search over Apple Notes.
+
+Notes from the NotesIndex are split into chunks whose vectors are stored next to the
+full-text index in notes_index.db. The vectors follow the notes index: after each refresh
+only the notes that were added, changed or deleted are chunked and embedded again (with
+CachedEmbeddings, unchanged chunks of an edited note are not sent to the API either).
+
+search() returns the chunks closest to a question. In hybrid mode the ranking of the
+full-text index and the vector ranking are merged with reciprocal rank fusion, so a note
+is found both by its exact words and by its meaning.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import sqlite3
+import threading
+import numpy as np
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from embedding_store import model_name
+
+NOTE_CHUNK_SIZE = 800
+NOTE_CHUNK_OVERLAP = 100
+
+# Notes embedded per API call while catching up
+_SYNC_BATCH = 32
+
+# Constant of reciprocal rank fusion; larger values flatten the difference between ranks
+RRF_K = 60
+
+#----------------------------------------------------------------------------
+# Note vectors
+#----------------------------------------------------------------------------
+
+class NoteVectorIndex:
+    """Vectors of note chunks, kept in sync with a NotesIndex."""
+
+    def __init__(self, notes_index, embedding, splitter=None):
+        self.notes_index = notes_index
+        self.embedding = embedding
+        self.splitter = splitter or RecursiveCharacterTextSplitter(
+            chunk_size=NOTE_CHUNK_SIZE, chunk_overlap=NOTE_CHUNK_OVERLAP
+        )
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(notes_index.db_path, check_same_thread=False)
+
+        with self.lock, self.conn:
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS note_chunks (
+                    note_id TEXT NOT NULL,
+                    chunk INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    vector BLOB NOT NULL,
+                    PRIMARY KEY (note_id, chunk)
+                )
+            ''')
+            # Version of each note that its chunks were made from, also for notes without text
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS note_vector_state (
+                    note_id TEXT PRIMARY KEY,
+                    modified REAL NOT NULL,
+                    model TEXT NOT NULL
+                )
+            ''')
+
+        # Normalised vectors kept in memory for fast search, loaded on first use
+        self.ids = None
+        self.matrix = None
+
+        notes_index.add_listener(lambda changed, deleted: self.sync())
+
+    def _load_matrix(self):
+        rows = self.conn.execute("SELECT note_id, chunk, vector FROM note_chunks ORDER BY note_id, chunk").fetchall()
+        self.ids = [(note_id, chunk) for note_id, chunk, _ in rows]
+        if rows:
+            self.matrix = np.vstack([np.frombuffer(v, dtype=np.float32) for _, _, v in rows])
+        else:
+            self.matrix = None
+
+    def sync(self):
+        """Embed the notes that changed since the last sync and forget the deleted ones."""
+        model = model_name(self.embedding)
+        with self.lock:
+            versions = self.notes_index.versions()
+            state = {
+                note_id: (modified, note_model)
+                for note_id, modified, note_model in self.conn.execute(
+                    "SELECT note_id, modified, model FROM note_vector_state"
+                )
+            }
+            stale = [note_id for note_id, modified in versions.items() if state.get(note_id) != (modified, model)]
+            deleted = [note_id for note_id in state if note_id not in versions]
+            if not stale and not deleted:
+                return
+
+            with self.conn:
+                for note_id in deleted:
+                    self.conn.execute("DELETE FROM note_chunks WHERE note_id = ?", (note_id,))
+                    self.conn.execute("DELETE FROM note_vector_state WHERE note_id = ?", (note_id,))
+
+            for start in range(0, len(stale), _SYNC_BATCH):
+                notes = self.notes_index.get(stale[start:start + _SYNC_BATCH])
+                chunks = [
+                    (note_id, i, text)
+                    for note_id, note in notes.items()
+                    for i, text in enumerate(self.splitter.split_text(note["text"]))
+                ]
+                # The title goes with every chunk so that it counts for each of them
+                inputs = [f"{notes[note_id]['name']}\n{text}" for note_id, _, text in chunks]
+                if chunks:
+                    vectors = np.asarray(self.embedding.embed_documents(inputs), dtype=np.float32)
+                    vectors /= np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+                else:
+                    vectors = []  # only empty notes: nothing to embed, but their state is still saved
+
+                with self.conn:
+                    for note_id, note in notes.items():
+                        self.conn.execute("DELETE FROM note_chunks WHERE note_id = ?", (note_id,))
+                        self.conn.execute(
+                            "INSERT OR REPLACE INTO note_vector_state (note_id, modified, model) VALUES (?, ?, ?)",
+                            (note_id, note["modified"], model),
+                        )
+                    self.conn.executemany(
+                        "INSERT INTO note_chunks (note_id, chunk, text, vector) VALUES (?, ?, ?, ?)",
+                        [(note_id, i, text, v.tobytes()) for (note_id, i, text), v in zip(chunks, vectors)],
+                    )
+
+            print(f"Note vectors: {len(stale)} notes embedded, {len(deleted)} removed")
+            self.ids = None
+            self.matrix = None
+
+    def _scores(self, query):
+        # Cosine similarity of query with every chunk
+        with self.lock:
+            if self.ids is None:
+                self._load_matrix()
+            if self.matrix is None:
+                return [], None
+            ids = list(self.ids)
+            matrix = self.matrix
+
+        q = np.asarray(self.embedding.embed_query(query), dtype=np.float32)
+        q /= max(np.linalg.norm(q), 1e-12)
+        return ids, matrix @ q
+
+    def _chunk_texts(self, wanted):
+        texts = {}
+        with self.lock:
+            for note_id, chunk in wanted:
+                row = self.conn.execute(
+                    "SELECT text FROM note_chunks WHERE note_id = ? AND chunk = ?", (note_id, chunk)
+                ).fetchone()
+                if row:  # a sync may have replaced the chunk since the search started
+                    texts[(note_id, chunk)] = row[0]
+        return texts
+
+    def search(self, query, k=5, hybrid=False, fts_limit=50):
+        """
+        The k note chunks most relevant to query, best first, as dicts of
+        note_id, name, text and score.
+        Without hybrid the score is the cosine similarity. With hybrid, notes are ranked by
+        reciprocal rank fusion of their full-text rank and their best chunk's vector rank,
+        and each note comes with its best chunk.
+        """
+        ids, scores = self._scores(query)
+        if scores is None:
+            return []
+
+        if not hybrid:
+            top = list(np.argsort(-scores)[:k])
+            picked = [(ids[i], float(scores[i])) for i in top]
+        else:
+            # Best chunk of every note, and the notes in order of that chunk's similarity
+            best = {}
+            for i in np.argsort(-scores):
+                best.setdefault(ids[i][0], i)
+            fused = {}
+            for rank, note_id in enumerate(best):
+                fused[note_id] = 1.0 / (RRF_K + rank + 1)
+            for rank, note in enumerate(self.notes_index.search(query, limit=fts_limit)):
+                if note["id"] in best:
+                    fused[note["id"]] += 1.0 / (RRF_K + rank + 1)
+            ranked = sorted(fused, key=fused.get, reverse=True)[:k]
+            picked = [(ids[best[note_id]], fused[note_id]) for note_id in ranked]
+
+        texts = self._chunk_texts([key for key, _ in picked])
+        notes = self.notes_index.get({note_id for (note_id, _), _ in picked})
+        return [
+            {
+                "note_id": note_id,
+                "name": notes[note_id]["name"] if note_id in notes else "",
+                "text": texts[(note_id, chunk)],
+                "score": score,
+            }
+            for (note_id, chunk), score in picked
+            if (note_id, chunk) in texts
+        ]
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,186 @@
+"""
+Persistent on-disk cache for the FAISS indexes built by ask_about_pdf.
+
+Indexes are keyed by a hash of the PDF bytes plus the chunking and embedding parameters,
+so repeat questions about the same file load the saved index from disk instead of
+parsing, chunking and embedding the whole document again.
+The cache has a size cap and evicts the least recently used indexes first.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import shutil
+import sqlite3
+import hashlib
+import threading
+import time
+from langchain_community.vectorstores.faiss import FAISS
+
+#----------------------------------------------------------------------------
+# Cache location and limits
+#----------------------------------------------------------------------------
+
+user_dir = os.path.expanduser("~/Library/Application Support/Majid")
+CACHE_DIR = os.path.join(user_dir, "pdf_index_cache")
+MAX_CACHE_BYTES = 500 * 1024 * 1024  # 500 MB
+
+#----------------------------------------------------------------------------
+# Cache keys
+#----------------------------------------------------------------------------
+
+def file_sha256(path, block_size=1024 * 1024):
+    """Hash a file in blocks so big PDFs are never read into memory at once."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def make_cache_key(pdf_path, chunk_size, chunk_overlap, embedding_model, index_type="flat"):
+    """
+    Build the cache key of a PDF index.
+    Any change in the file content or in the way it is chunked, embedded or indexed gives a new key.
+    """
+    digest = hashlib.sha256()
+    digest.update(file_sha256(pdf_path).encode())
+    digest.update(f"|{chunk_size}|{chunk_overlap}|{embedding_model}".encode())
+    if index_type != "flat":
+        digest.update(f"|{index_type}".encode())  # keys of flat indexes stay as they were
+    return digest.hexdigest()
+
+
+def _folder_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+#----------------------------------------------------------------------------
+# Index cache
+#----------------------------------------------------------------------------
+
+class PDFIndexCache:
+    """
+    Saved FAISS indexes under the Majid application-support folder.
+    Every index lives in its own folder named after its key; a small SQLite manifest
+    keeps the size and last use time of each entry for LRU eviction.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.manifest_path = os.path.join(self.cache_dir, "manifest.db")
+
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    pdf_path TEXT NOT NULL,
+                    size_bytes INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+
+    def _connect(self):
+        return sqlite3.connect(self.manifest_path)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def load(self, key, embedding):
+        """Return the cached vector store for key, or None on a cache miss."""
+        with self.lock:
+            with self._connect() as conn:
+                row = conn.execute("SELECT key FROM entries WHERE key = ?", (key,)).fetchone()
+                if row is None or not os.path.isdir(self._entry_dir(key)):
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    return None
+                conn.execute("UPDATE entries SET last_used = ? WHERE key = ?", (time.time(), key))
+
+        try:
+            # the pickled docstore was written by save() below, so it is safe to load
+            return FAISS.load_local(self._entry_dir(key), embedding, allow_dangerous_deserialization=True)
+        except Exception as e:
+            print(f"Dropping unreadable PDF index {key}: {e}")
+            self.invalidate(key=key)
+            return None
+
+    def save(self, key, vectorstore, pdf_path):
+        """Store a vector store under key and evict old entries if the cache is too big."""
+        entry_dir = self._entry_dir(key)
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}-{threading.get_ident()}"
+        vectorstore.save_local(tmp_dir)
+        size_bytes = _folder_size(tmp_dir)
+        now = time.time()
+        pdf_path = os.path.abspath(pdf_path)
+
+        with self.lock:
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.replace(tmp_dir, entry_dir)
+            with self._connect() as conn:
+                # An older version of the same file will never be asked for again
+                stale = conn.execute(
+                    "SELECT key FROM entries WHERE pdf_path = ? AND key != ?", (pdf_path, key)
+                ).fetchall()
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (key, pdf_path, size_bytes, created, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (key, pdf_path, size_bytes, now, now),
+                )
+            self._remove([k for (k,) in stale])
+            self._evict()
+
+    def invalidate(self, key=None, pdf_path=None):
+        """
+        Remove the entry with the given key, or every entry built from pdf_path.
+        Returns the number of removed entries.
+        """
+        with self.lock:
+            with self._connect() as conn:
+                if key is not None:
+                    rows = conn.execute("SELECT key FROM entries WHERE key = ?", (key,)).fetchall()
+                elif pdf_path is not None:
+                    rows = conn.execute(
+                        "SELECT key FROM entries WHERE pdf_path = ?", (os.path.abspath(pdf_path),)
+                    ).fetchall()
+                else:
+                    rows = []
+            keys = [k for (k,) in rows]
+            self._remove(keys)
+            return len(keys)
+
+    def clear(self):
+        """Remove every cached index."""
+        with self.lock:
+            with self._connect() as conn:
+                keys = [k for (k,) in conn.execute("SELECT key FROM entries").fetchall()]
+            self._remove(keys)
+
+    def _remove(self, keys):
+        if not keys:
+            return
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in keys])
+        for k in keys:
+            shutil.rmtree(self._entry_dir(k), ignore_errors=True)
+
+    def _evict(self):
+        # Drop least recently used entries until the cache fits in max_bytes
+        with self._connect() as conn:
+            rows = conn.execute("SELECT key, size_bytes FROM entries ORDER BY last_used DESC").fetchall()
+
+        total = 0
+        evicted = []
+        for i, (k, size_bytes) in enumerate(rows):
+            total += size_bytes
+            # never evict the most recent entry, even if it alone is over the cap
+            if i > 0 and total > self.max_bytes:
+                evicted.append(k)
+        self._remove(evicted)
@@ -0,0 +1,141 @@
+"""
+Streaming PDF ingestion for the RAG pipeline.
+
+Pages are parsed lazily with pdfplumber, split into chunks one page at a time and embedded
+in bounded windows that are appended to the FAISS index as they are ready. Apart from the
+index itself, peak memory depends on the window size and not on the number of pages.
+
+Text extraction of big PDFs can be spread over several processes: page ranges are parsed
+in a ProcessPoolExecutor and merged back in page order. Workers are always spawned (not
+forked), which also works in the frozen .app as long as its entry point (main.py) calls
+multiprocessing.freeze_support() first.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import pdfplumber
+from langchain_core.documents import Document
+from ann_index import convert_vectorstore
+
+# Number of chunks embedded and added to the index at a time
+WINDOW_SIZE = 256
+
+# Parallel extraction: worker processes (None = one per core), pages per task,
+# and the page count under which a PDF is simply read in this process
+EXTRACT_WORKERS = None
+SHARD_PAGES = 16
+PARALLEL_MIN_PAGES = 64
+
+#----------------------------------------------------------------------------
+# Generators
+#----------------------------------------------------------------------------
+
+def _page_document(pdf_path, text, page_number, total_pages):
+    return Document(
+        page_content=text,
+        metadata={"source": pdf_path, "file_path": pdf_path, "page": page_number, "total_pages": total_pages},
+    )
+
+
+def iter_pdf_pages(pdf_path):
+    """Yield one Document per page, with the same metadata keys as PDFPlumberLoader."""
+    with pdfplumber.open(pdf_path) as pdf:
+        total_pages = len(pdf.pages)
+        for i, page in enumerate(pdf.pages):
+            text = page.extract_text() or ""
+            page.close()  # drop the parsed layout objects of this page
+            yield _page_document(pdf_path, text, i, total_pages)
+
+
+def _extract_page_range(pdf_path, start, stop):
+    """Text of pages start..stop-1. Runs in a worker process."""
+    texts = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page in pdf.pages[start:stop]:
+            texts.append(page.extract_text() or "")
+            page.close()
+    return texts
+
+
+def count_pages(pdf_path):
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
+
+
+def iter_pdf_pages_parallel(pdf_path, workers=EXTRACT_WORKERS, shard_pages=SHARD_PAGES):
+    """
+    Yield one Document per page like iter_pdf_pages, extracting page ranges in worker processes.
+    Only a few ranges per worker are in flight, so memory stays bounded.
+    """
+    workers = workers or os.cpu_count() or 1
+    total_pages = count_pages(pdf_path)
+    shards = [(start, min(start + shard_pages, total_pages)) for start in range(0, total_pages, shard_pages)]
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        pending = deque()
+        next_shard = 0
+        try:
+            while next_shard < len(shards) or pending:
+                while next_shard < len(shards) and len(pending) < 2 * workers:
+                    start, stop = shards[next_shard]
+                    pending.append((start, pool.submit(_extract_page_range, pdf_path, start, stop)))
+                    next_shard += 1
+
+                # Wait for the oldest shard so pages come out in order
+                start, future = pending.popleft()
+                for offset, text in enumerate(future.result()):
+                    yield _page_document(pdf_path, text, start + offset, total_pages)
+        finally:
+            for _, future in pending:
+                future.cancel()
+
+
+def iter_pages(pdf_path, workers=EXTRACT_WORKERS):
+    """Pick serial or parallel extraction. Small files and a single worker use serial extraction."""
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or count_pages(pdf_path) < PARALLEL_MIN_PAGES:
+        return iter_pdf_pages(pdf_path)
+    return iter_pdf_pages_parallel(pdf_path, workers=workers)
+
+
+def iter_chunks(pages, splitter):
+    """Split a stream of pages into a stream of chunks."""
+    for page in pages:
+        yield from splitter.split_documents([page])
+
+
+def iter_windows(items, size=WINDOW_SIZE):
+    """Group a stream into lists of at most size items."""
+    window = []
+    for item in items:
+        window.append(item)
+        if len(window) >= size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+#----------------------------------------------------------------------------
+# Index building
+#----------------------------------------------------------------------------
+
+def build_pdf_index(pdf_path, splitter, scheduler, window_size=WINDOW_SIZE, workers=EXTRACT_WORKERS,
+                    index_type="flat"):
+    """
+    Parse, split and embed a PDF window by window into one FAISS index.
+    The flat index is then turned into index_type (see ann_index) if the PDF is big enough.
+    """
+    vectorstore = None
+    pages = iter_pages(pdf_path, workers=workers)
+    for window in iter_windows(iter_chunks(pages, splitter), window_size):
+        vectorstore = scheduler.build_faiss(window, vectorstore=vectorstore)
+
+    if vectorstore is None:
+        raise ValueError(f"No text found in PDF: {pdf_path}")
+    return convert_vectorstore(vectorstore, index_type)
@@ -12,7 +12,6 @@ Author: Taha Parsayan
 import rumps
 import subprocess
 from langchain_functions import *
-from langchain_openai import ChatOpenAI
 from langchain_core.messages import HumanMessage
 import datetime
 import pync
@@ -23,6 +22,17 @@ from dotenv import load_dotenv
 import threading
 
 import pdfplumber
+from summary_sources import fetch_sources
+from job_runner import JobRunner
+from summary_cache import SummaryCache, summary_fingerprint
+
+# Seconds to wait for each summary source before going on without it
+SUMMARY_SOURCE_TIMEOUTS = {"Calendar": 15, "Reminders": 20, "Notes": 20}
+# Calendar and Reminders are read through one helper process, one request at a time, so one
+# may wait for the other: both calls together must fit in the shorter of their timeouts above
+APPLE_CALL_TIMEOUT = 6
+# The summary is made again in the background this often (it is reused if nothing changed)
+SUMMARY_REFRESH_MINUTES = 30
 
 print("\nRunning rump with:", sys.executable)
 print("Frozen:", getattr(sys, "frozen", False))
@@ -32,11 +42,32 @@ class MajidRump(rumps.App):
     def __init__(self):
         super().__init__("😼 Majid", icon="icons/Menu_icon.png")
         self.menu = ["Majid summary", 
+                     "Cancel summary",
                      "Set API keys",
                     ]
 
         self.current_path = os.getcwd()
 
+        # Slow menu actions run in the background; their results come back on this timer
+        self.jobs = JobRunner()
+        self.job_timer = rumps.Timer(lambda _: self.jobs.poll(), 0.25)
+        self.job_timer.start()
+
+        # Summaries are saved by a fingerprint of their data and refreshed on a timer.
+        # rumps timers fire once as soon as the app starts, so this also prewarms at login.
+        self.summary_cache = SummaryCache()
+        self.summary_waiting = False  # True while the user waits for a summary they asked for
+        self.summary_timer = rumps.Timer(self.prewarm_summary, SUMMARY_REFRESH_MINUTES * 60)
+        self.summary_timer.start()
+
+        # Start the background indexing of the document folders, off the main thread.
+        # Nothing is embedded (so no API key is needed) until a folder is synced.
+        self.jobs.submit(
+            "corpus",
+            lambda job: get_corpus_index(),
+            on_error=lambda e: print(f"Document library not started: {e}"),
+        )
+
     #********** Chat to majid **********
 
     # @rumps.clicked("Chat to Majid")
@@ -112,6 +143,28 @@ class MajidRump(rumps.App):
         # Notify user that summary is being generated
         #--------------------------------------------------
 
+        if self.summary_waiting:
+            pync.notify("Patience, human. I'm still working on it 🐾", title="😼 Majid")
+            return
+
+        #--------------------------------------------------
+        # Make the summary in the background
+        #--------------------------------------------------
+
+        # The sources are read again (Calendar and Reminders from their local cache, which only
+        # fetches changes) and a saved summary is shown only if it was made from the same data.
+        # If a scheduled refresh is already running, this waits for its result.
+        self.title = "😼 Majid ⏳"
+        self.summary_waiting = True
+        self.jobs.submit(
+            "summary",
+            self.generate_summary,
+            on_done=self.summary_done,
+            on_error=self.summary_failed,
+            on_progress=self.summary_progress,
+        )
+
+    def notify_making_summary(self):
         funny_titles = [
         "😼 Majid – Master of Chaos",
         "🐾 The Overlord Cat",
@@ -138,25 +191,80 @@ class MajidRump(rumps.App):
             sound="default",
         )
 
-        try:
-            summary = self.generate_summary()
-            icon_path = os.path.join(base_path, "icons", "App_icon.icns")
-            rumps.alert(title="😼 Majid Summary", message=summary)
-        except Exception as e:
-            rumps.alert("Error", f"Error making the summary: \n {str(e)}")
+    # These run on the main thread, from the job timer
+
+    def summary_done(self, summary):
+        self.summary_waiting = False
+        self.title = "😼 Majid"
+        self.menu["Cancel summary"].title = "Cancel summary"
+        rumps.alert(title="😼 Majid Summary", message=summary)
+
+    def summary_failed(self, error):
+        self.summary_waiting = False
+        self.title = "😼 Majid"
+        self.menu["Cancel summary"].title = "Cancel summary"
+        rumps.alert("Error", f"Error making the summary: \n {str(error)}")
+
+    def summary_progress(self, message):
+        # Only a summary that needs the LLM takes long enough to be worth a notification
+        if message == "thinking" and self.summary_waiting:
+            self.notify_making_summary()
+        self.menu["Cancel summary"].title = f"Cancel summary ({message})"
+
+    @rumps.clicked("Cancel summary")
+    def cancel_summary(self, _):
+        if self.jobs.cancel("summary"):
+            self.summary_waiting = False
+            self.title = "😼 Majid"
+            self.menu["Cancel summary"].title = "Cancel summary"
+            pync.notify("Fine, I'll go back to my nap 😾", title="😼 Majid")
+
+    def prewarm_summary(self, _=None):
+        # Runs on the timer; joins a summary that is already being made
+        self.jobs.submit(
+            "summary",
+            self.generate_summary,
+            on_error=lambda e: print(f"Scheduled summary failed: {e}"),
+        )
 
     #--------------------------------------------------
     # Function to generate summary using LangChain and OpenAI
     #--------------------------------------------------
 
-    def generate_summary(self):
-        # get current date
+    def generate_summary(self, job=None):
+        # job is the background job running this, used for progress and cancellation
         now = datetime.datetime.now()
+        day = now.date().isoformat()
+
+        # Read the three sources at the same time; a slow one does not block the others
+        if job:
+            job.progress("reading your stuff")
+        sources = fetch_sources({
+            "Calendar": lambda: calendar_events_text(timeout=APPLE_CALL_TIMEOUT),
+            "Reminders": lambda: reminders_text(timeout=APPLE_CALL_TIMEOUT),
+            "Notes": lambda: get_apple_notes(""),
+        }, timeouts=SUMMARY_SOURCE_TIMEOUTS)
+        texts = {name: source["text"] for name, source in sources.items()}
+
+        # Same day and same data: the summary we already have is still right
+        fingerprint = summary_fingerprint(day, texts)
+        cached = self.summary_cache.get(fingerprint)
+        if cached is not None:
+            print("Summary data unchanged, using the saved summary")
+            return cached
+
+        summary = self.compose_summary(now, texts, job)
+
+        # A summary made without one of the sources is not saved, so it is made again next time
+        if all(source["status"] == "ok" for source in sources.values()):
+            self.summary_cache.put(fingerprint, day, summary)
+        return summary
+
+    def compose_summary(self, now, texts, job=None):
         day_date = now.strftime("%A, %B %d, %Y")
-
-        reminders_text = get_apple_reminders("")
-        notes_text = get_apple_notes("")
-        calendar_text = read_calendar_events("")
+        calendar_text = texts["Calendar"]
+        reminders_text = texts["Reminders"]
+        notes_text = texts["Notes"]
 
         prompt = (
             "You are Majid, a sarcastic, talking cat with a chaotic sense of humor. You think you're smarter than humans, "
@@ -193,10 +301,11 @@ class MajidRump(rumps.App):
         )
 
 
-        model = ChatOpenAI(
-            model_name="gpt-3.5-turbo",
-            temperature=1,
-        )
+        if job:
+            job.check_cancelled()
+            job.progress("thinking")
+
+        model = get_llm(model_name="gpt-3.5-turbo", temperature=1)
 
         response = model.invoke([HumanMessage(content=prompt)])
         return response.content
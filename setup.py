@@ -23,6 +23,31 @@ DATA_FILES = [
     'chatbox_WEB.py',
     'enter_api_WEB.py',
     'langchain_functions.py',
+    'pdf_index_cache.py',
+    'embedding_store.py',
+    'embedding_scheduler.py',
+    'pdf_ingest.py',
+    'chat_store.py',
+    'conversation_memory.py',
+    'conversation_recall.py',
+    'agent_runtime.py',
+    'chat_streaming.py',
+    'chat_page.py',
+    'chat_sessions.py',
+    'chatbox_ASYNC.py',
+    'summary_sources.py',
+    'job_runner.py',
+    'summary_cache.py',
+    'notes_index.py',
+    'notes_search.py',
+    'apple_bridge.py',
+    'apple_helper.js',
+    'apple_cache.py',
+    'file_index.py',
+    'dir_listing.py',
+    'corpus_index.py',
+    'mmap_vectors.py',
+    'ann_index.py',
     ('icons', glob.glob('icons/*')),
     '/opt/miniconda3/envs/majid/lib/libsqlite3.dylib',
     ('charset_normalizer', glob.glob('/opt/miniconda3/envs/majid/lib/python3.12/site-packages/charset_normalizer/md__mypyc*.so')),
@@ -55,6 +80,7 @@ OPTIONS = {
     },
     'packages': [
 'flask',
+        'aiohttp',
         'parsedatetime',
         'parsedatetime.pdt_locales',
         'charset_normalizer',
@@ -0,0 +1,72 @@
+"""
+Cache of Majid summaries.
+
+A summary is stored under a fingerprint of the day and of the calendar, reminders and notes
+text it was made from. When the data has not changed, the saved summary is reused and the
+LLM is not called again, so a summary prewarmed by a scheduled refresh is shown as soon as
+the sources have been read and found unchanged.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+user_dir = os.path.expanduser("~/Library/Application Support/Majid")
+CACHE_PATH = os.path.join(user_dir, "summary_cache.db")
+
+#----------------------------------------------------------------------------
+# Fingerprint
+#----------------------------------------------------------------------------
+
+def summary_fingerprint(day, sources):
+    """Hash of the day and of every {name: text} source, in a stable order."""
+    digest = hashlib.sha256(day.encode("utf-8"))
+    for name in sorted(sources):
+        digest.update(b"\0" + name.encode("utf-8") + b"\0" + sources[name].encode("utf-8"))
+    return digest.hexdigest()
+
+#----------------------------------------------------------------------------
+# Cache
+#----------------------------------------------------------------------------
+
+class SummaryCache:
+    """Summaries by fingerprint; only the last keep_days days are kept."""
+
+    def __init__(self, db_path=CACHE_PATH, keep_days=7):
+        self.db_path = db_path
+        self.keep_days = keep_days
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+
+        with self._connect() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS summaries (
+                    fingerprint TEXT PRIMARY KEY,
+                    day TEXT NOT NULL,
+                    summary TEXT NOT NULL,
+                    created REAL NOT NULL
+                )
+            ''')
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path)
+
+    def get(self, fingerprint):
+        with self.lock, self._connect() as conn:
+            row = conn.execute("SELECT summary FROM summaries WHERE fingerprint = ?", (fingerprint,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, fingerprint, day, summary):
+        now = time.time()
+        with self.lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (fingerprint, day, summary, created) VALUES (?, ?, ?, ?)",
+                (fingerprint, day, summary, now),
+            )
+            conn.execute("DELETE FROM summaries WHERE created < ?", (now - self.keep_days * 86400,))
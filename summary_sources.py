@@ -0,0 +1,70 @@
+"""
+Concurrent fetching of the data behind the Majid summary.
+
+Calendar, Reminders and Notes are read at the same time on worker threads, each with its
+own timeout. A source that fails or hangs does not hold back the others: the summary is
+made with what arrived, and the missing source is marked as unavailable.
+How long each source took is recorded so slow ones can be spotted.
+
+Not every source really runs in parallel: Calendar and Reminders both go through the one
+AppleBridge helper (and the AppleDataCache lock), which answers one request at a time.
+The second of them waits for the first, so their timeouts must leave room for both calls;
+rump.py gives each bridge call a timeout well below the per-source timeouts.
+"""
+
+#----------------------------------------------------------------------------
+# Import libraries
+#----------------------------------------------------------------------------
+
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+DEFAULT_TIMEOUT = 20.0  # seconds
+
+#----------------------------------------------------------------------------
+# Fetching
+#----------------------------------------------------------------------------
+
+def _timed_call(fetch):
+    start = time.perf_counter()
+    try:
+        return fetch(), None, time.perf_counter() - start
+    except Exception as e:
+        return None, e, time.perf_counter() - start
+
+
+def fetch_sources(fetchers, timeouts=None, default_timeout=DEFAULT_TIMEOUT):
+    """
+    Run every fetcher of {name: callable} concurrently.
+    Returns {name: {"text", "status", "seconds"}} where status is "ok", "error" or "timeout".
+    The text of a failed source says that it is unavailable, so it can go straight into a prompt.
+    """
+    timeouts = timeouts or {}
+    pool = ThreadPoolExecutor(max_workers=max(1, len(fetchers)), thread_name_prefix="summary-source")
+    start = time.perf_counter()
+    futures = {name: pool.submit(_timed_call, fetch) for name, fetch in fetchers.items()}
+
+    results = {}
+    for name, future in futures.items():
+        deadline = start + timeouts.get(name, default_timeout)
+        try:
+            value, error, seconds = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+        except TimeoutError:
+            results[name] = {
+                "text": f"({name} did not answer in time)",
+                "status": "timeout",
+                "seconds": time.perf_counter() - start,
+            }
+            continue
+
+        if error is not None:
+            results[name] = {"text": f"({name} is unavailable: {error})", "status": "error", "seconds": seconds}
+        else:
+            results[name] = {"text": str(value), "status": "ok", "seconds": seconds}
+
+    # Do not wait for hung sources; their threads finish in the background
+    pool.shutdown(wait=False, cancel_futures=True)
+
+    timings = ", ".join(f"{name} {r['seconds']:.2f}s ({r['status']})" for name, r in results.items())
+    print(f"Summary sources fetched in {time.perf_counter() - start:.2f}s: {timings}")
+    return results